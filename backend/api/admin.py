@@ -0,0 +1,24 @@
+from django.contrib import admin, messages
+
+from .models import PendingStudent
+from .reconcile import reconcile_pending_students
+
+
+@admin.action(description="Merge selected into matching registered students")
+def reconcile_with_registered(modeladmin, request, queryset):
+    totals = reconcile_pending_students(queryset)
+    modeladmin.message_user(
+        request,
+        f"Merged {totals['matched']} of {totals['scanned']} pending students "
+        f"({totals['memberships_moved']} class memberships moved, "
+        f"{totals['memberships_dropped']} duplicates dropped) in {totals['seconds']:.2f}s.",
+        messages.SUCCESS,
+    )
+
+
+@admin.register(PendingStudent)
+class PendingStudentAdmin(admin.ModelAdmin):
+    list_display = ('email', 'first_name', 'last_name', 'student_id', 'school', 'added_by', 'created_at')
+    list_filter = ('school',)
+    search_fields = ('email', 'student_id', 'first_name', 'last_name')
+    actions = [reconcile_with_registered]
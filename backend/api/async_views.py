@@ -0,0 +1,359 @@
+"""Native async views for the endpoints hit hardest at the start of an event.
+
+Scans, the event lookup the scanner does first, and sign-ins all arrive in a
+burst when a class walks in. Under ASGI the blocking parts of these views (the
+raw check-in INSERT, lookups, fsyncing the write-behind spool, rendering a PDF)
+run on the event loop's thread pool via in_db_thread / thread_sensitive=False,
+so concurrent requests don't queue behind the single thread that plain
+sync_to_async and the async ORM share. Under WSGI Django still runs them, one
+event loop per request.
+"""
+import asyncio
+import json
+import traceback
+from datetime import datetime, timedelta
+
+import jwt
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import IntegrityError
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+
+from .attendance_buffer import get_buffer
+from .checkin import CheckInError, avalidate_check_in, insert_check_in
+from .db_threads import in_db_thread
+from .live import attendance_message, subscribe, unsubscribe
+from .lookups import aget_by_email
+from .mail_queue import aenqueue_mail
+from .models import Attendance, Event, Faculty, Student
+from .qr import get_event_qr_pdf
+from .conditional import add_validators, not_modified, validators
+from .read_cache import acached
+from .serializers import EventSerializer, sparse_fields
+
+
+def _request_data(request):
+    """The JSON body, or the form fields for a form-encoded POST"""
+    if request.content_type == 'application/json':
+        try:
+            data = json.loads(request.body or b'{}')
+        except ValueError:
+            return None
+        return data if isinstance(data, dict) else None
+    return request.POST
+
+
+def _malformed():
+    return JsonResponse({'detail': 'Malformed request body.'}, status=400)
+
+
+# ---------------- Check In ----------------
+@csrf_exempt
+@require_POST
+async def check_in(request):
+    """Record a scan with a single INSERT; repeated scans are acknowledged with a 200"""
+    data = _request_data(request)
+    if data is None:
+        return _malformed()
+    try:
+        scan = await avalidate_check_in(data)
+    except CheckInError as e:
+        return JsonResponse(e.errors, status=400)
+
+    # In write-behind mode the scan is spooled and written with the next batch
+    buffer = get_buffer()
+    if buffer is not None:
+        await sync_to_async(buffer.add, thread_sensitive=False)(
+            scan['student'], scan['event'], location=scan['location'], device_id=scan['device_id'],
+        )
+        return JsonResponse({
+            'message': 'Attendance accepted',
+            'student': str(scan['student']),
+            'event': str(scan['event']),
+            'queued': True
+        }, status=202)
+
+    try:
+        attendance_id = await in_db_thread(insert_check_in)(
+            scan['student'], scan['event'],
+            location=scan['location'], device_id=scan['device_id'],
+        )
+    except IntegrityError:
+        return JsonResponse({'student': ['Student not found.']}, status=400)
+
+    if attendance_id is None:
+        return JsonResponse({
+            'message': 'Attendance already recorded for this event',
+            'student': str(scan['student']),
+            'event': str(scan['event']),
+            'duplicate': True
+        }, status=200)
+
+    return JsonResponse({
+        'message': 'Attendance recorded',
+        'id': attendance_id,
+        'student': str(scan['student']),
+        'event': str(scan['event']),
+        'duplicate': False
+    }, status=201)
+
+
+# ---------------- Event Detail ----------------
+@require_GET
+async def event_detail(request, event_id):
+    """Read-only event lookup for the scanner; same body as GET /events/<id>/"""
+    @in_db_thread
+    def load():
+        event = Event.objects.get(pk=event_id)
+        return dict(EventSerializer(event).data), event.updated_at
+
+    try:
+        data, updated_at = await acached('event', event_id, load)
+    except Event.DoesNotExist:
+        return JsonResponse({'detail': 'Not found.'}, status=404)
+
+    fields = request.GET.get('fields') or ''
+    etag, last_modified = validators('event', event_id, updated_at, fields)
+    response = not_modified(request, etag, last_modified)
+    if response is None:
+        response = add_validators(JsonResponse(sparse_fields(data, fields)), etag, last_modified)
+    return response
+
+
+@require_GET
+async def generate_event_qr(request, event_id):
+    """Generate a QR code PDF for an event"""
+    try:
+        # Only the fields printed on the page are needed; they also key the PDF cache
+        event = await in_db_thread(Event.objects.only('id', 'name', 'date', 'end_time', 'location').get)(pk=event_id)
+        # Rendering is CPU-bound, so keep it off the event loop and the shared sync thread
+        pdf = await sync_to_async(get_event_qr_pdf, thread_sensitive=False)(event)
+        response = HttpResponse(pdf, content_type='application/pdf')
+        response['Content-Disposition'] = f'attachment; filename="event_{event_id}_qr.pdf"'
+        return response
+    except Event.DoesNotExist:
+        return JsonResponse({'error': 'Event not found'}, status=404)
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
+
+
+# ---------------- Student Sign In ----------------
+@csrf_exempt
+@require_POST
+async def student_signin(request):
+    data = _request_data(request)
+    if data is None:
+        return _malformed()
+    email = data.get('email')
+    student_id = data.get('student_id')
+    remember_me = data.get('remember_me', False)
+
+    try:
+        student = await aget_by_email(Student.objects.all(), email)
+
+        if student.student_id != student_id:
+            return JsonResponse({'error': 'Invalid student ID'}, status=400)
+
+        # Token expiration: 30 days if "Remember Me" is selected, otherwise 24 hours
+        token_expiration = timedelta(days=30) if remember_me else timedelta(hours=24)
+        token = jwt.encode({
+            'student_id': str(student.id),
+            'exp': datetime.utcnow() + token_expiration
+        }, settings.SECRET_KEY, algorithm='HS256')
+
+        verification_url = f"{settings.FRONTEND_URL}/verify-email?token={token}"
+        html_message = f"""
+        <h3>Sign In to ClassAttend</h3>
+        <p>Click the button below to sign in to your account:</p>
+        <p><a href="{verification_url}" style="background-color: #DEA514; color: white; padding: 10px 20px; text-decoration: none; border-radius: 5px;">Sign In</a></p>
+        <p>If the button doesn't work, you can copy and paste this link into your browser:</p>
+        <p>{verification_url}</p>
+        """
+
+        await aenqueue_mail(
+            subject="Sign in to ClassAttend",
+            message=f"Click the following link to sign in: {verification_url}",
+            from_email=settings.DEFAULT_FROM_EMAIL,
+            recipient_list=[student.email],
+            html_message=html_message,
+        )
+
+        return JsonResponse({'message': 'Please check your email for the sign-in link.'})
+
+    except Student.DoesNotExist:
+        return JsonResponse({'error': 'No account found with this email'}, status=404)
+    except Exception as e:
+        traceback.print_exc()
+        return JsonResponse({'error': 'An error occurred during sign in'}, status=500)
+
+# ---------------- Student Direct Sign In ----------------
+@csrf_exempt
+@require_POST
+async def student_direct_signin(request):
+    data = _request_data(request)
+    if data is None:
+        return _malformed()
+    email = data.get('email')
+    student_id = data.get('student_id')
+    remember_me = data.get('remember_me', False)
+
+    if not email or not student_id:
+        return JsonResponse({'error': 'Email and Student ID are required'}, status=400)
+
+    try:
+        student = await aget_by_email(Student.objects.all(), email)
+
+        # Verify the student ID matches
+        if student.student_id != student_id:
+            return JsonResponse({'error': 'Invalid credentials'}, status=401)
+
+        # Token expiration: 30 days if "Remember Me" is selected, otherwise 24 hours
+        token_expiration = timedelta(days=30) if remember_me else timedelta(hours=24)
+
+        # Generate token
+        token = jwt.encode({
+            'student_id': str(student.id),
+            'exp': datetime.utcnow() + token_expiration
+        }, settings.SECRET_KEY, algorithm='HS256')
+
+        # Return token and student info directly
+        return JsonResponse({
+            'message': 'Sign-in successful',
+            'token': token,
+            'student_id': str(student.id),
+            'first_name': student.first_name,
+            'last_name': student.last_name
+        })
+
+    except Student.DoesNotExist:
+        return JsonResponse({'error': 'Invalid credentials'}, status=401)
+    except Exception as e:
+        traceback.print_exc()
+        return JsonResponse({'error': 'An error occurred during sign in'}, status=500)
+
+# ---------------- Faculty SignIn ----------------
+@csrf_exempt
+@require_POST
+async def faculty_signin(request):
+    data = _request_data(request)
+    if data is None:
+        return _malformed()
+    email = data.get('email')
+    remember_me = data.get('remember_me', False)
+
+    try:
+        faculty = await aget_by_email(Faculty.objects.all(), email)
+
+        if not faculty.email_verified:
+            return JsonResponse({
+                'error': 'Please verify your email address first'
+            }, status=400)
+
+        # Token expiration: 30 days if "Remember Me" is selected, otherwise 24 hours
+        token_expiration = timedelta(days=30) if remember_me else timedelta(days=1)
+
+        # Generate authentication token
+        token = jwt.encode({
+            'faculty_id': str(faculty.id),
+            'exp': datetime.utcnow() + token_expiration
+        }, settings.SECRET_KEY, algorithm='HS256')
+
+        # Send signin link via email
+        signin_url = f"{settings.FRONTEND_URL}/verify-email?token={token}&type=faculty"
+        html_message = f"""
+        <h3>Faculty Sign In</h3>
+        <p>Click the button below to sign in to your ClassAttend account:</p>
+        <p><a href="{signin_url}" style="background-color: #DEA514; color: white; padding: 10px 20px; text-decoration: none; border-radius: 5px;">Sign In</a></p>
+        <p>If the button doesn't work, you can copy and paste this link into your browser:</p>
+        <p>{signin_url}</p>
+        """
+
+        await aenqueue_mail(
+            subject="ClassAttend Faculty Sign In Link",
+            message=f"Click the following link to sign in: {signin_url}",
+            from_email=settings.DEFAULT_FROM_EMAIL,
+            recipient_list=[faculty.email],
+            html_message=html_message,
+        )
+
+        return JsonResponse({
+            'message': 'Please check your email for the sign-in link.'
+        })
+
+    except Faculty.DoesNotExist:
+        return JsonResponse({
+            'error': 'No faculty account found with this email address'
+        }, status=404)
+    except Exception as e:
+        traceback.print_exc()
+        return JsonResponse({
+            'error': f'Sign in error: {str(e)}'
+        }, status=500)
+
+
+# ---------------- Live Attendance ----------------
+LIVE_KEEPALIVE_SECONDS = 15
+
+
+def _sse(message):
+    return f"id: {message['id']}\nevent: attendance\ndata: {json.dumps(message)}\n\n"
+
+
+async def _live_attendance_stream(event_id, after_id):
+    # Subscribe before reading the backlog so nothing committed in between is missed
+    queue = subscribe(event_id)
+    try:
+        yield "retry: 3000\n\n"
+        backlog = Attendance.objects.filter(event_id=event_id)
+        if after_id:
+            backlog = backlog.filter(id__gt=after_id)
+        sent = set()
+        rows = backlog.order_by('id').values_list('id', 'student_id', 'event_id', 'scanned_at')
+        for row in await in_db_thread(list)(rows):
+            sent.add(row[0])
+            yield _sse(attendance_message(*row))
+
+        while True:
+            try:
+                message = await asyncio.wait_for(queue.get(), LIVE_KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                # Keeps proxies from closing an idle connection
+                yield ": keepalive\n\n"
+                continue
+            if message['id'] in sent:
+                continue
+            yield _sse(message)
+    finally:
+        unsubscribe(event_id, queue)
+
+
+async def live_event_attendance(request, event_id):
+    """Stream an event's check-ins to a faculty screen as Server-Sent Events.
+
+    Check-ins already recorded are sent first (only the ones after Last-Event-ID
+    when the browser reconnects), then each new one as it is committed.
+    """
+    faculty_id = request.GET.get('faculty_id')
+    if not faculty_id:
+        return JsonResponse({"error": "Faculty authentication required"}, status=401)
+
+    event = await in_db_thread(Event.objects.filter(pk=event_id).values('faculty_id').first)()
+    if event is None:
+        return JsonResponse({"error": "Event not found"}, status=404)
+    if str(event['faculty_id']) != str(faculty_id):
+        return JsonResponse({"error": "You do not have permission to access this data"}, status=403)
+
+    try:
+        after_id = int(request.headers.get('Last-Event-ID') or 0)
+    except ValueError:
+        after_id = 0
+
+    response = StreamingHttpResponse(
+        _live_attendance_stream(event_id, after_id),
+        content_type='text/event-stream',
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,283 @@
+"""Optional write-behind buffering for attendance scans.
+
+When ATTENDANCE_WRITE_BEHIND is enabled, validated scans are appended to a
+per-process spool file (fsynced before the request is acknowledged) and kept in
+memory until a background thread writes them in one batch every
+ATTENDANCE_FLUSH_INTERVAL_MS milliseconds, or as soon as
+ATTENDANCE_FLUSH_MAX_ROWS scans are waiting.
+
+Spool files are named after the owning process (its pid and start time) plus a
+random token, so a worker that is handed a recycled pid never appends to or
+adopts an earlier process's spool. On start-up a worker claims the spool files
+of processes that are no longer running and replays them, so a crash or restart
+between acknowledging a scan and flushing it loses nothing.
+"""
+import atexit
+import json
+import logging
+import os
+import threading
+from uuid import UUID, uuid4
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .checkin import insert_check_ins
+from .models import Event, Student
+
+logger = logging.getLogger(__name__)
+
+SPOOL_SUFFIX = '.spool'
+FLUSHING_SUFFIX = '.flushing'
+
+
+def _process_start(pid):
+    """Start time of a process (clock ticks since boot), or None where /proc isn't available"""
+    try:
+        with open(f'/proc/{pid}/stat', 'r') as stat:
+            # The command name may contain spaces, so count fields from its closing parenthesis
+            return stat.read().rsplit(')', 1)[1].split()[19]
+    except (OSError, IndexError):
+        return None
+
+
+def _process_tag():
+    pid = os.getpid()
+    return f"{pid}-{_process_start(pid) or 0}"
+
+
+def _owner_from_spool_name(name):
+    """(pid, start time) of the process that owns a spool file; start is None for old names"""
+    try:
+        parts = name.split('-', 1)[1].split('.', 1)[0].split('-')
+        return int(parts[0]), (parts[1] if len(parts) > 1 and parts[1] != '0' else None)
+    except (IndexError, ValueError):
+        return None
+
+
+def _owner_alive(pid, start):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    if pid == os.getpid():
+        return start == _process_start(pid)
+    # A live pid with a different start time has been recycled by a new process
+    if start is not None:
+        current = _process_start(pid)
+        if current is not None and current != start:
+            return False
+    return True
+
+
+def _read_spool(path):
+    """Read the scans stored in a spool file, skipping a torn final line"""
+    scans = []
+    with open(path, 'r', encoding='utf-8') as spool:
+        for line in spool:
+            try:
+                scans.append(json.loads(line))
+            except ValueError:
+                continue
+    return scans
+
+
+def write_scans(scans):
+    """Write spooled scans to the database; returns the number of rows submitted"""
+    if not scans:
+        return 0
+
+    # ON CONFLICT only covers the unique constraint, so a row pointing at a
+    # missing student or event would fail the whole batch; filter them first.
+    student_ids = {scan['student'] for scan in scans}
+    event_ids = {scan['event'] for scan in scans}
+    known_students = {str(pk) for pk in Student.objects.filter(pk__in=student_ids).values_list('pk', flat=True)}
+    known_events = {str(pk) for pk in Event.objects.filter(pk__in=event_ids).values_list('pk', flat=True)}
+
+    rows = []
+    for scan in scans:
+        if scan['student'] not in known_students or scan['event'] not in known_events:
+            # The client was already told the scan was accepted, so make the loss visible
+            logger.warning(
+                "Dropping spooled scan for unknown student %s or event %s (scanned at %s)",
+                scan['student'], scan['event'], scan.get('scanned_at'),
+            )
+            continue
+        rows.append({
+            'student': UUID(scan['student']),
+            'event': UUID(scan['event']),
+            'scanned_at': parse_datetime(scan['scanned_at']),
+            'location': scan.get('location'),
+            'device_id': scan.get('device_id'),
+        })
+
+    insert_check_ins(rows)
+    return len(rows)
+
+
+def replay_orphaned_spools(spool_dir=None):
+    """Claim and write the spool files left behind by dead processes.
+
+    If writing a file fails it is handed back under its original name, so it
+    is claimed again by the next replay here or in another worker, and the
+    error is raised.
+    """
+    spool_dir = spool_dir or settings.ATTENDANCE_SPOOL_DIR
+    if not os.path.isdir(spool_dir):
+        return 0
+
+    replayed = 0
+    for name in sorted(os.listdir(spool_dir)):
+        if not name.endswith((SPOOL_SUFFIX, FLUSHING_SUFFIX)):
+            continue
+        owner = _owner_from_spool_name(name)
+        if owner is None or _owner_alive(*owner):
+            continue
+
+        # Renaming claims the file; if another worker got there first, move on.
+        # The new name carries our identity, so it is reclaimed if we die as well.
+        claimed_name = f"attendance-{_process_tag()}-{uuid4().hex[:8]}.{name.replace('.', '_')}{FLUSHING_SUFFIX}"
+        claimed = os.path.join(spool_dir, claimed_name)
+        try:
+            os.rename(os.path.join(spool_dir, name), claimed)
+        except FileNotFoundError:
+            continue
+
+        try:
+            replayed += write_scans(_read_spool(claimed))
+        except Exception:
+            os.rename(claimed, os.path.join(spool_dir, name))
+            raise
+        os.remove(claimed)
+    return replayed
+
+
+class WriteBehindBuffer:
+    """Per-process buffer of acknowledged scans backed by an append-only spool file"""
+
+    def __init__(self, spool_dir, flush_interval_ms, max_rows):
+        self.spool_dir = spool_dir
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_rows = max_rows
+        self.pid = os.getpid()
+        # Unique per buffer, so nothing ever appends to a spool another process left behind
+        name = f"attendance-{_process_tag()}-{uuid4().hex[:8]}"
+        self.spool_path = os.path.join(spool_dir, f"{name}{SPOOL_SUFFIX}")
+        self.flushing_path = os.path.join(spool_dir, f"{name}{FLUSHING_SUFFIX}")
+
+        self._pending = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = False
+
+        os.makedirs(spool_dir, exist_ok=True)
+        self._spool = open(self.spool_path, 'a', encoding='utf-8')
+        self._thread = threading.Thread(target=self._run, name='attendance-flusher', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        atexit.register(self.stop)
+
+    def add(self, student_id, event_id, location=None, device_id=None):
+        """Durably record a scan; it is written to the database on the next flush"""
+        scan = {
+            'student': str(student_id),
+            'event': str(event_id),
+            'scanned_at': timezone.now().isoformat(),
+            'location': location,
+            'device_id': device_id,
+        }
+        line = json.dumps(scan) + '\n'
+        with self._lock:
+            self._spool.write(line)
+            self._spool.flush()
+            os.fsync(self._spool.fileno())
+            self._pending.append(scan)
+            full = len(self._pending) >= self.max_rows
+        if full:
+            self._wakeup.set()
+        return scan
+
+    def flush(self):
+        """Write every buffered scan to the database"""
+        with self._flush_lock:
+            # A previous flush that failed left its batch behind; retry it first
+            if os.path.exists(self.flushing_path):
+                write_scans(_read_spool(self.flushing_path))
+                os.remove(self.flushing_path)
+
+            with self._lock:
+                if not self._pending:
+                    return 0
+                batch, self._pending = self._pending, []
+                self._spool.close()
+                os.rename(self.spool_path, self.flushing_path)
+                self._spool = open(self.spool_path, 'a', encoding='utf-8')
+
+            written = write_scans(batch)
+            os.remove(self.flushing_path)
+            return written
+
+    def stop(self):
+        if self._stopped:
+            return
+        self._stopped = True
+        self._wakeup.set()
+        try:
+            self.flush()
+        except Exception:
+            logger.exception("Final flush of attendance scans failed; they stay in %s", self.flushing_path)
+
+    def _replay_orphans(self):
+        """Replay dead processes' spools; returns False if that has to be tried again"""
+        try:
+            replayed = replay_orphaned_spools(self.spool_dir)
+        except Exception:
+            logger.exception("Replaying orphaned attendance spools failed; retrying on the next flush")
+            return False
+        if replayed:
+            logger.info("Replayed %s spooled attendance scans", replayed)
+        return True
+
+    def _run(self):
+        replayed = self._replay_orphans()
+        while not self._stopped:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                if not replayed:
+                    replayed = self._replay_orphans()
+                self.flush()
+            except Exception:
+                # The batch stays in the .flushing file and is retried next round
+                logger.exception("Flushing attendance scans failed; retrying on the next flush")
+            finally:
+                connection.close()
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def get_buffer():
+    """Return this process's write-behind buffer, or None when the mode is disabled"""
+    global _buffer
+    if not settings.ATTENDANCE_WRITE_BEHIND:
+        return None
+    # Started lazily so each forked worker gets its own spool file and thread
+    if _buffer is None or _buffer.pid != os.getpid():
+        with _buffer_lock:
+            if _buffer is None or _buffer.pid != os.getpid():
+                buffer = WriteBehindBuffer(
+                    settings.ATTENDANCE_SPOOL_DIR,
+                    settings.ATTENDANCE_FLUSH_INTERVAL_MS,
+                    settings.ATTENDANCE_FLUSH_MAX_ROWS,
+                )
+                buffer.start()
+                _buffer = buffer
+    return _buffer
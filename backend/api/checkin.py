@@ -0,0 +1,221 @@
+"""Fast path for recording attendance scans.
+
+During the start of a class every student scans within a couple of minutes, so
+the check-in endpoint avoids the generic ModelSerializer path: the event and its
+check-in window are validated against a short-lived per-process snapshot, and
+the attendance row is written with a single INSERT ... ON CONFLICT DO NOTHING
+statement. Inserted rows are published to the live attendance feed. Saving or deleting an event drops its snapshot (see signals.py).
+"""
+import threading
+import time
+from datetime import timedelta
+from uuid import UUID
+
+from django.db import connection
+from django.utils import timezone
+
+from .db_threads import in_db_thread
+from .live import attendance_message, publish_attendance
+from .models import Attendance, Event
+
+# How long an event snapshot is trusted before it is re-read from the database
+EVENT_SNAPSHOT_TTL = 60
+
+_EVENT_SNAPSHOT_FIELDS = (
+    'id', 'school_id', 'faculty_id', 'date', 'end_time',
+    'checkin_before_minutes', 'checkin_after_minutes',
+)
+
+_INSERT_FIELDS = ('student', 'event', 'scanned_at', 'location', 'device_id')
+
+_snapshots = {}
+_snapshots_lock = threading.Lock()
+
+
+class CheckInError(Exception):
+    """Raised when a scan payload can't be recorded; carries DRF-style field errors"""
+
+    def __init__(self, errors):
+        super().__init__(errors)
+        self.errors = errors
+
+
+def _cached_snapshot(event_id):
+    cached = _snapshots.get(event_id)
+    if cached is not None and cached[0] > time.monotonic():
+        return cached[1]
+    return None
+
+
+def _store_snapshot(event_id, snapshot):
+    if snapshot is not None:
+        # Worked out once per snapshot so each scan only compares two datetimes
+        snapshot['checkin_opens'], snapshot['checkin_closes'] = check_in_window(snapshot)
+        with _snapshots_lock:
+            _snapshots[event_id] = (time.monotonic() + EVENT_SNAPSHOT_TTL, snapshot)
+    return snapshot
+
+
+def get_event_snapshot(event_id):
+    """Return the cached check-in data for an event, or None if the event doesn't exist"""
+    snapshot = _cached_snapshot(event_id)
+    if snapshot is None:
+        snapshot = _store_snapshot(
+            event_id, Event.objects.filter(pk=event_id).values(*_EVENT_SNAPSHOT_FIELDS).first()
+        )
+    return snapshot
+
+
+async def aget_event_snapshot(event_id):
+    """Async version of get_event_snapshot; only a cache miss leaves the event loop"""
+    snapshot = _cached_snapshot(event_id)
+    if snapshot is None:
+        snapshot = await in_db_thread(get_event_snapshot)(event_id)
+    return snapshot
+
+
+def forget_event_snapshot(event_id=None):
+    """Drop one cached event snapshot, or all of them"""
+    with _snapshots_lock:
+        if event_id is None:
+            _snapshots.clear()
+        else:
+            _snapshots.pop(event_id, None)
+
+
+def check_in_window(event):
+    """Return when check-in for an event snapshot opens and closes"""
+    opens = event['date'] - timedelta(minutes=event['checkin_before_minutes'])
+    closes = event['date'] + timedelta(minutes=event['checkin_after_minutes'])
+    return opens, closes
+
+
+def ensure_check_in_open(event, now=None):
+    """Raise CheckInError if the event's check-in window isn't open"""
+    now = now or timezone.now()
+    opens, closes = event['checkin_opens'], event['checkin_closes']
+    if now < opens:
+        raise CheckInError({'non_field_errors': [
+            f"Check-in for this event opens at {timezone.localtime(opens).strftime('%I:%M %p')}."
+        ]})
+    if now > closes:
+        raise CheckInError({'non_field_errors': [
+            f"Check-in for this event closed at {timezone.localtime(closes).strftime('%I:%M %p')}."
+        ]})
+
+
+def _parse_uuid(value, field):
+    try:
+        return UUID(str(value))
+    except (TypeError, ValueError):
+        raise CheckInError({field: ['Must be a valid UUID.']})
+
+
+def _check_length(value, field):
+    if value is None:
+        return
+    if not isinstance(value, str):
+        raise CheckInError({field: ['Not a valid string.']})
+    max_length = Attendance._meta.get_field(field).max_length
+    if len(value) > max_length:
+        raise CheckInError({field: [f'Ensure this field has no more than {max_length} characters.']})
+
+
+def _parse_check_in(data):
+    if not data.get('student'):
+        raise CheckInError({'student': ['This field is required.']})
+    if not data.get('event'):
+        raise CheckInError({'event': ['This field is required.']})
+
+    location = data.get('location') or None
+    device_id = data.get('device_id') or None
+    _check_length(location, 'location')
+    _check_length(device_id, 'device_id')
+    return {
+        'student': _parse_uuid(data.get('student'), 'student'),
+        'event': _parse_uuid(data.get('event'), 'event'),
+        'location': location,
+        'device_id': device_id,
+    }
+
+
+def _check_event(event):
+    if event is None:
+        raise CheckInError({'event': ['Event not found.']})
+    ensure_check_in_open(event)
+
+
+def validate_check_in(data):
+    """Validate a scan payload and return the normalized values"""
+    scan = _parse_check_in(data)
+    _check_event(get_event_snapshot(scan['event']))
+    return scan
+
+
+async def avalidate_check_in(data):
+    """Async version of validate_check_in"""
+    scan = _parse_check_in(data)
+    _check_event(await aget_event_snapshot(scan['event']))
+    return scan
+
+
+def _insert_statement(row_count, returning=False):
+    fields = [Attendance._meta.get_field(name) for name in _INSERT_FIELDS]
+    quote = connection.ops.quote_name
+    columns = ', '.join(quote(field.column) for field in fields)
+    placeholders = ', '.join(['(' + ', '.join(['%s'] * len(fields)) + ')'] * row_count)
+    sql = (
+        f"INSERT INTO {quote(Attendance._meta.db_table)} ({columns}) VALUES {placeholders} "
+        f"ON CONFLICT ({quote('student_id')}, {quote('event_id')}) DO NOTHING"
+    )
+    if returning:
+        sql += " RETURNING " + ", ".join(quote(column) for column in ('id', 'student_id', 'event_id', 'scanned_at'))
+    return fields, sql
+
+
+def _insert_params(fields, scan):
+    return [field.get_db_prep_save(scan.get(field.name), connection) for field in fields]
+
+
+def insert_check_in(student_id, event_id, location=None, device_id=None, scanned_at=None):
+    """Insert an attendance row in one round trip.
+
+    Returns the new row id, or None if the student had already checked in to
+    the event. Raises IntegrityError if the student doesn't exist.
+    """
+    scan = {
+        'student': student_id,
+        'event': event_id,
+        'scanned_at': scanned_at or timezone.now(),
+        'location': location,
+        'device_id': device_id,
+    }
+    fields, sql = _insert_statement(1, returning=True)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, _insert_params(fields, scan))
+        row = cursor.fetchone()
+    if row is None:
+        return None
+    publish_attendance([attendance_message(*row)])
+    return row[0]
+
+
+def insert_check_ins(scans, batch_size=500):
+    """Insert many scans with multi-row INSERT ... ON CONFLICT DO NOTHING statements.
+
+    This is what bulk_create(ignore_conflicts=True) issues, except that the
+    scan's own scanned_at is kept instead of being overwritten by auto_now_add.
+    Returns the number of rows actually inserted.
+    """
+    inserted = []
+    for start in range(0, len(scans), batch_size):
+        batch = scans[start:start + batch_size]
+        fields, sql = _insert_statement(len(batch), returning=True)
+        params = []
+        for scan in batch:
+            params.extend(_insert_params(fields, scan))
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            inserted.extend(cursor.fetchall())
+    publish_attendance(attendance_message(*row) for row in inserted)
+    return len(inserted)
@@ -0,0 +1,36 @@
+"""Conditional GET for read-mostly resources.
+
+Validators are built from the updated_at stamps on School, Event and Class, so
+a request whose If-None-Match (or If-Modified-Since) is still current gets a
+304 before anything is serialized. Responses carry Cache-Control: no-cache, so
+browsers keep the body but check back on every request.
+"""
+import hashlib
+
+from django.utils.cache import get_conditional_response, patch_cache_control, quote_etag
+from django.utils.http import http_date
+
+
+def validators(kind, key, updated_at, variant=''):
+    """Strong ETag and Last-Modified timestamp for one version of a resource.
+
+    variant covers anything else that changes the body, e.g. ?fields=.
+    """
+    digest = hashlib.md5(f"{kind}:{key}:{updated_at.isoformat()}:{variant}".encode()).hexdigest()
+    return quote_etag(digest), int(updated_at.timestamp())
+
+
+def add_validators(response, etag, last_modified=None):
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    patch_cache_control(response, no_cache=True)
+    return response
+
+
+def not_modified(request, etag, last_modified=None):
+    """A 304 if the client's copy is current, otherwise None"""
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is not None:
+        add_validators(response, etag, last_modified)
+    return response
@@ -0,0 +1,25 @@
+"""Run blocking database work from async views without queueing behind one thread.
+
+sync_to_async (and the async ORM methods, which are built on it) defaults to
+thread_sensitive=True, which sends every call in the process through a single
+shared thread. Independent lookups and inserts from the async views go to the
+event loop's thread pool instead, so concurrent requests really do run side by
+side. Pool threads outlive requests and never see request_finished, so each
+call tidies up its thread's connection the way the end of a request would.
+"""
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+
+
+def in_db_thread(func):
+    """Wrap func so awaiting it runs it on a pool thread with its own connection"""
+    @wraps(func)
+    def call(*args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+
+    return sync_to_async(call, thread_sensitive=False)
@@ -0,0 +1,159 @@
+"""Live attendance feed.
+
+New attendance rows are published per event and fanned out to every open
+Server-Sent Events stream for that event (see live_event_attendance in
+async_views.py). Streams are async and need the ASGI entry point.
+
+By default delivery is in-process, which is enough when a single web process
+serves both the scans and the faculty screens (and for local development on
+SQLite). With ATTENDANCE_LIVE_NOTIFY enabled on Postgres, publishing sends a
+NOTIFY instead and every process runs one LISTEN thread that fans the
+notifications out to its own subscribers, so scans recorded by any worker reach
+every screen.
+"""
+import asyncio
+import json
+import select
+import threading
+import time
+import traceback
+from uuid import UUID
+
+from django.conf import settings
+from django.db import connection, transaction
+
+CHANNEL = 'attendance_live'
+# Scans buffered per subscriber before a slow stream starts dropping them
+SUBSCRIBER_QUEUE_SIZE = 1000
+
+_subscribers = {}
+_subscribers_lock = threading.Lock()
+
+_listener = None
+_listener_lock = threading.Lock()
+
+
+def _notify_enabled():
+    return settings.ATTENDANCE_LIVE_NOTIFY and connection.vendor == 'postgresql'
+
+
+def _put(queue, message):
+    try:
+        queue.put_nowait(message)
+    except asyncio.QueueFull:
+        pass
+
+
+def _deliver(message):
+    """Hand a message to this process's subscribers of its event; safe from any thread"""
+    with _subscribers_lock:
+        targets = list(_subscribers.get(message['event'], ()))
+    for loop, queue in targets:
+        try:
+            loop.call_soon_threadsafe(_put, queue, message)
+        except RuntimeError:
+            # The subscriber's event loop has already shut down
+            continue
+
+
+def subscribe(event_id):
+    """Register the running event loop for an event's scans and return its queue"""
+    if _notify_enabled():
+        _ensure_listener()
+    queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+    entry = (asyncio.get_running_loop(), queue)
+    with _subscribers_lock:
+        _subscribers.setdefault(str(event_id), set()).add(entry)
+    return queue
+
+
+def unsubscribe(event_id, queue):
+    with _subscribers_lock:
+        entries = _subscribers.get(str(event_id), set())
+        entries.difference_update({entry for entry in entries if entry[1] is queue})
+        if not entries:
+            _subscribers.pop(str(event_id), None)
+
+
+def attendance_message(attendance_id, student_id, event_id, scanned_at):
+    # Raw RETURNING rows may carry UUIDs in the backend's storage format
+    return {
+        'id': attendance_id,
+        'student': str(UUID(str(student_id))),
+        'event': str(UUID(str(event_id))),
+        'scanned_at': scanned_at.isoformat() if hasattr(scanned_at, 'isoformat') else scanned_at,
+    }
+
+
+def publish_attendance(messages):
+    """Publish newly recorded attendance once the current transaction commits"""
+    messages = list(messages)
+    if not messages:
+        return
+
+    def send():
+        if _notify_enabled():
+            with connection.cursor() as cursor:
+                for message in messages:
+                    cursor.execute("SELECT pg_notify(%s, %s)", [CHANNEL, json.dumps(message)])
+        else:
+            for message in messages:
+                _deliver(message)
+
+    transaction.on_commit(send)
+
+
+# ---------------- Postgres LISTEN ----------------
+def _listen_connection():
+    import psycopg2
+
+    params = connection.get_connection_params()
+    # The transaction pooler can't hold a LISTEN, so connect in session mode
+    if settings.ATTENDANCE_LIVE_LISTEN_PORT:
+        params['port'] = settings.ATTENDANCE_LIVE_LISTEN_PORT
+    params.pop('cursor_factory', None)
+    listen = psycopg2.connect(**params)
+    listen.autocommit = True
+    with listen.cursor() as cursor:
+        cursor.execute(f"LISTEN {CHANNEL}")
+    return listen
+
+
+def _listen_forever():
+    delay = 1
+    while True:
+        listen = None
+        try:
+            listen = _listen_connection()
+            delay = 1
+            while True:
+                # Wake up now and then so a dead connection is noticed
+                if select.select([listen], [], [], 30) == ([], [], []):
+                    with listen.cursor() as cursor:
+                        cursor.execute("SELECT 1")
+                    continue
+                listen.poll()
+                while listen.notifies:
+                    notify = listen.notifies.pop(0)
+                    try:
+                        _deliver(json.loads(notify.payload))
+                    except (ValueError, KeyError):
+                        continue
+        except Exception:
+            traceback.print_exc()
+            time.sleep(delay)
+            delay = min(delay * 2, 60)
+        finally:
+            if listen is not None:
+                try:
+                    listen.close()
+                except Exception:
+                    pass
+
+
+def _ensure_listener():
+    global _listener
+    with _listener_lock:
+        if _listener is None or not _listener.is_alive():
+            _listener = threading.Thread(target=_listen_forever, name='attendance-listener', daemon=True)
+            _listener.start()
@@ -0,0 +1,52 @@
+"""Case-insensitive email lookups.
+
+Emails are stored as typed, so every lookup goes through the ``lower``
+transform registered on CharField in models.py. ``email__lower=...`` compiles
+to ``LOWER(email) = ...``, which is served by the unique Lower('email')
+constraints on Student, PendingStudent and Faculty, so it matches one row at most.
+"""
+from django.db.models import IntegerField, Value
+
+from .db_threads import in_db_thread
+from .models import PendingStudent, Student
+
+STUDENT_FIELDS = ('id', 'email', 'first_name', 'last_name', 'student_id')
+
+
+def normalize_email(email):
+    return (email or '').strip().lower()
+
+
+def get_by_email(queryset, email):
+    """Like queryset.get(email=email), but ignoring case"""
+    obj = queryset.filter(email__lower=normalize_email(email)).first()
+    if obj is None:
+        raise queryset.model.DoesNotExist(f"No {queryset.model.__name__} with email {email}")
+    return obj
+
+
+async def aget_by_email(queryset, email):
+    """Async version of get_by_email"""
+    return await in_db_thread(get_by_email)(queryset, email)
+
+
+def find_student_by_email(email):
+    """Find a registered or pending student by email in a single query.
+
+    Returns a dict of STUDENT_FIELDS plus status ('registered' or 'pending'),
+    preferring a registered student, or None if there is neither.
+    """
+    email = normalize_email(email)
+    if not email:
+        return None
+    registered = Student.objects.filter(email__lower=email).annotate(
+        rank=Value(0, output_field=IntegerField()),
+    ).values(*STUDENT_FIELDS, 'rank')
+    pending = PendingStudent.objects.filter(email__lower=email).annotate(
+        rank=Value(1, output_field=IntegerField()),
+    ).values(*STUDENT_FIELDS, 'rank')
+    row = registered.union(pending, all=True).order_by('rank').first()
+    if row is None:
+        return None
+    row['status'] = 'registered' if row.pop('rank') == 0 else 'pending'
+    return row
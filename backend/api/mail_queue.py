@@ -0,0 +1,134 @@
+"""Durable outbound mail queue.
+
+Views call enqueue_mail(), which only inserts an OutboundEmail row, so a slow
+SMTP handshake never holds up a request. The send_queued_mail management
+command drains the queue: each batch is claimed with SELECT ... FOR UPDATE SKIP
+LOCKED (so several workers can run side by side) and the claim is committed
+before the batch is sent over a single SMTP connection. Failures are retried
+with exponential backoff until MAIL_QUEUE_MAX_ATTEMPTS is used up.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .db_threads import in_db_thread
+from .models import OutboundEmail
+
+RETRY_BASE_SECONDS = 30
+RETRY_MAX_SECONDS = 60 * 60
+
+
+def enqueue_mail(subject, message, recipient_list, html_message=None, from_email=None):
+    """Queue an email for delivery; takes the same arguments as send_mail"""
+    return OutboundEmail.objects.create(
+        subject=subject,
+        body=message,
+        html_body=html_message,
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+        recipients=list(recipient_list),
+    )
+
+
+async def aenqueue_mail(subject, message, recipient_list, html_message=None, from_email=None):
+    """Async version of enqueue_mail"""
+    return await in_db_thread(enqueue_mail)(
+        subject, message, recipient_list, html_message=html_message, from_email=from_email,
+    )
+
+
+def _retry_delay(attempts):
+    return timedelta(seconds=min(RETRY_BASE_SECONDS * 2 ** (attempts - 1), RETRY_MAX_SECONDS))
+
+
+def _claim_batch(batch_size):
+    """Take a batch of due emails for this worker and commit the claim.
+
+    Rows are picked with SELECT ... FOR UPDATE SKIP LOCKED and marked as
+    sending, so the row locks are held only for this short transaction rather
+    than for the SMTP round trip. The attempt is counted here, which means a
+    worker that dies mid-send still uses one up; its claim is picked up again
+    after MAIL_QUEUE_CLAIM_TIMEOUT seconds.
+    """
+    now = timezone.now()
+    due = Q(status=OutboundEmail.STATUS_PENDING, next_attempt_at__lte=now) | Q(
+        status=OutboundEmail.STATUS_SENDING,
+        claimed_at__lte=now - timedelta(seconds=settings.MAIL_QUEUE_CLAIM_TIMEOUT),
+    )
+    with transaction.atomic():
+        batch = list(
+            OutboundEmail.objects.select_for_update(skip_locked=True)
+            .filter(due)
+            .order_by('next_attempt_at', 'id')[:batch_size]
+        )
+        for email in batch:
+            email.status = OutboundEmail.STATUS_SENDING
+            email.claimed_at = now
+            email.attempts += 1
+        if batch:
+            OutboundEmail.objects.bulk_update(batch, ['status', 'claimed_at', 'attempts'])
+    return batch
+
+
+def _failed(email, error, max_attempts):
+    email.last_error = str(error)
+    if email.attempts >= max_attempts:
+        email.status = OutboundEmail.STATUS_FAILED
+    else:
+        email.status = OutboundEmail.STATUS_PENDING
+        email.next_attempt_at = timezone.now() + _retry_delay(email.attempts)
+
+
+def send_queued_mail(batch_size=None, max_attempts=None):
+    """Send one batch of due emails over a single SMTP connection.
+
+    Returns a (sent, failed) tuple for the batch.
+    """
+    batch_size = batch_size or settings.MAIL_QUEUE_BATCH_SIZE
+    max_attempts = max_attempts or settings.MAIL_QUEUE_MAX_ATTEMPTS
+
+    batch = _claim_batch(batch_size)
+    if not batch:
+        return 0, 0
+
+    sent = failed = 0
+    connection = get_connection(fail_silently=False)
+    try:
+        connection.open()
+        for email in batch:
+            message = EmailMultiAlternatives(
+                subject=email.subject,
+                body=email.body,
+                from_email=email.from_email,
+                to=email.recipients,
+                connection=connection,
+            )
+            if email.html_body:
+                message.attach_alternative(email.html_body, 'text/html')
+
+            try:
+                message.send()
+            except Exception as e:
+                failed += 1
+                _failed(email, e, max_attempts)
+            else:
+                sent += 1
+                email.status = OutboundEmail.STATUS_SENT
+                email.sent_at = timezone.now()
+                email.last_error = None
+    except Exception as e:
+        # Couldn't reach the SMTP server at all: the attempt counts for every email not yet handled
+        for email in batch:
+            if email.status == OutboundEmail.STATUS_SENDING:
+                _failed(email, e, max_attempts)
+        failed = len(batch) - sent
+    finally:
+        connection.close()
+
+    OutboundEmail.objects.bulk_update(
+        batch, ['status', 'next_attempt_at', 'last_error', 'sent_at']
+    )
+    return sent, failed
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from api.attendance_buffer import replay_orphaned_spools
+
+
+class Command(BaseCommand):
+    help = "Write attendance scans left in the spool directory by stopped workers"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--spool-dir', help="Spool directory (defaults to ATTENDANCE_SPOOL_DIR)")
+
+    def handle(self, *args, **options):
+        written = replay_orphaned_spools(options.get('spool_dir'))
+        self.stdout.write(self.style.SUCCESS(f"Wrote {written} spooled attendance scans"))
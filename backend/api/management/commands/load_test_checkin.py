@@ -0,0 +1,159 @@
+import json
+import os
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.models import Event, Student
+
+
+def _percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))] if values else 0.0
+
+
+def _children(pid):
+    children = []
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat', 'r') as stat:
+                # The command name may contain spaces, so count fields from its closing parenthesis
+                parent = int(stat.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        if parent == pid:
+            children.append(int(entry))
+    return children
+
+
+def _tree_rss_mb(pid):
+    """Resident memory of a process and all of its descendants (e.g. gunicorn and its workers), in MB"""
+    total_kb = 0
+    pending = [pid]
+    while pending:
+        current = pending.pop()
+        try:
+            with open(f'/proc/{current}/status', 'r') as status:
+                for line in status:
+                    if line.startswith('VmRSS:'):
+                        total_kb += int(line.split()[1])
+                        break
+        except OSError:
+            continue
+        pending.extend(_children(current))
+    return total_kb / 1024
+
+
+class _RSSSampler(threading.Thread):
+    """Samples the server's resident memory while the load runs and keeps the peak"""
+
+    def __init__(self, pid, interval=0.1):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.interval = interval
+        self.peak_mb = 0.0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            self.peak_mb = max(self.peak_mb, _tree_rss_mb(self.pid))
+            self._stop_event.wait(self.interval)
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+        self.peak_mb = max(self.peak_mb, _tree_rss_mb(self.pid))
+
+
+def _request(url, body=None):
+    data = json.dumps(body).encode() if body is not None else None
+    request = urllib.request.Request(url, data=data, headers={'Content-Type': 'application/json'})
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=30) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    except (urllib.error.URLError, OSError):
+        status = 'error'
+    return status, time.perf_counter() - started
+
+
+class Command(BaseCommand):
+    help = (
+        "Replay a class walking in against a running server: every student loads the "
+        "event and then checks in. Run it against the WSGI and the ASGI server to compare. "
+        "Pass --server-pid (the gunicorn master, say) to also sample the server's resident "
+        "memory from /proc, workers included, and report throughput and concurrency per MB; "
+        "the server must run on the same Linux host."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('event', help="ID of an event whose check-in window is open")
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help="Base URL of the server")
+        parser.add_argument('--students', type=int, default=500, help="Students (from the event's school) to check in")
+        parser.add_argument('--concurrency', type=int, default=50, help="Students scanning at the same time")
+        parser.add_argument('--server-pid', type=int, help="PID of the server process whose memory (with its children) to sample")
+
+    def handle(self, *args, **options):
+        try:
+            event = Event.objects.only('id', 'school_id').get(pk=options['event'])
+        except (Event.DoesNotExist, ValueError):
+            raise CommandError(f"Event {options['event']} not found")
+        student_ids = [
+            str(pk) for pk in Student.objects.filter(school_id=event.school_id)
+            .values_list('id', flat=True)[:options['students']]
+        ]
+        if not student_ids:
+            raise CommandError("The event's school has no registered students")
+
+        base = options['url'].rstrip('/')
+        event_url = f"{base}/api/event/{event.id}/"
+        check_in_url = f"{base}/api/attendance/check-in/"
+
+        def scan(student_id):
+            lookup = _request(event_url)
+            check_in = _request(check_in_url, {'student': student_id, 'event': str(event.id)})
+            return lookup, check_in
+
+        sampler = None
+        if options['server_pid']:
+            if not os.path.exists(f"/proc/{options['server_pid']}/status"):
+                raise CommandError(f"No process {options['server_pid']} to sample (memory is read from /proc)")
+            idle_mb = _tree_rss_mb(options['server_pid'])
+            sampler = _RSSSampler(options['server_pid'])
+            sampler.start()
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(options['concurrency']) as pool:
+            results = list(pool.map(scan, student_ids))
+        elapsed = time.perf_counter() - started
+        if sampler:
+            sampler.stop()
+
+        for name, index in (('event lookup', 0), ('check-in', 1)):
+            statuses = Counter(result[index][0] for result in results)
+            latencies = [result[index][1] * 1000 for result in results]
+            self.stdout.write(
+                f"{name}: {dict(statuses)} p50 {_percentile(latencies, 0.5):.1f}ms "
+                f"p95 {_percentile(latencies, 0.95):.1f}ms p99 {_percentile(latencies, 0.99):.1f}ms"
+            )
+        requests_per_second = 2 * len(results) / elapsed
+        if sampler:
+            self.stdout.write(
+                f"server memory: {idle_mb:.1f} MB idle, {sampler.peak_mb:.1f} MB peak; "
+                f"{options['concurrency'] / sampler.peak_mb:.2f} concurrent requests per MB, "
+                f"{requests_per_second / sampler.peak_mb:.2f} req/s per MB"
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(results)} students ({2 * len(results)} requests) in {elapsed:.2f}s, "
+            f"{requests_per_second:.0f} req/s at concurrency {options['concurrency']}"
+        ))
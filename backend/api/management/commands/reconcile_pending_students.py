@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from api.models import PendingStudent
+from api.reconcile import DEFAULT_BATCH_SIZE, reconcile_pending_students
+
+
+def _rate(rows, seconds):
+    return f"{rows / seconds:.0f} rows/s" if seconds else "n/a"
+
+
+class Command(BaseCommand):
+    help = "Merge pending students into registered students with the same email or student ID"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--school', type=int, help="Only reconcile this school")
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                            help="Pending students handled per transaction")
+
+    def handle(self, *args, **options):
+        pending = PendingStudent.objects.all()
+        if options.get('school'):
+            pending = pending.filter(school_id=options['school'])
+
+        def progress(stats):
+            self.stdout.write(
+                f"School {stats['school']}: scanned {stats['scanned']}, matched {stats['matched']}, "
+                f"moved {stats['memberships_moved']} memberships, dropped {stats['memberships_dropped']} "
+                f"duplicates in {stats['seconds']:.2f}s ({_rate(stats['scanned'], stats['seconds'])})"
+            )
+
+        totals = reconcile_pending_students(pending, batch_size=options['batch_size'], progress=progress)
+        self.stdout.write(self.style.SUCCESS(
+            f"Reconciled {totals['matched']} of {totals['scanned']} pending students across "
+            f"{totals['schools']} schools in {totals['seconds']:.2f}s ({_rate(totals['scanned'], totals['seconds'])})"
+        ))
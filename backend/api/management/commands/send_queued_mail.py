@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from api.mail_queue import send_queued_mail
+
+
+class Command(BaseCommand):
+    help = "Send queued outbound emails"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help="Keep polling the queue instead of exiting")
+        parser.add_argument('--interval', type=float, default=5.0, help="Seconds to wait when the queue is empty")
+        parser.add_argument('--batch-size', type=int, help="Emails per batch (defaults to MAIL_QUEUE_BATCH_SIZE)")
+
+    def handle(self, *args, **options):
+        while True:
+            try:
+                sent, failed = send_queued_mail(batch_size=options.get('batch_size'))
+            except Exception as e:
+                if not options['loop']:
+                    raise
+                self.stderr.write(f"Error sending queued mail: {str(e)}")
+                sent = failed = 0
+                connection.close()
+
+            if sent or failed:
+                self.stdout.write(f"Sent {sent} emails, {failed} failed")
+
+            if not options['loop']:
+                break
+            # Drain a backlog without pausing; wait only once the queue is empty
+            if not (sent or failed):
+                time.sleep(options['interval'])
@@ -0,0 +1,21 @@
+# Generated by Django 5.0.2 on 2026-10-18 02:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0015_remove_classstudent_one_student_type_only_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['school', 'date'], name='event_school_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['faculty', 'date'], name='event_faculty_date_idx'),
+        ),
+    ]
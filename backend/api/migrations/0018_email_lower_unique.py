@@ -0,0 +1,49 @@
+# Generated by Django 5.0.2 on 2026-10-18 02:55
+
+import django.db.models.functions.text
+from django.core.management.base import CommandError
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import Lower
+
+
+def check_case_duplicates(apps, schema_editor):
+    """Stop, listing them, if any emails differ only in case; they have to be resolved by hand"""
+    conflicts = []
+    for model_name in ('Faculty', 'Student', 'PendingStudent'):
+        model = apps.get_model('api', model_name)
+        emails = (
+            model.objects.annotate(email_lower=Lower('email'))
+            .values('email_lower').annotate(count=Count('pk')).filter(count__gt=1)
+            .order_by('email_lower').values_list('email_lower', flat=True)
+        )
+        conflicts.extend(f"  {model_name}: {email}" for email in emails)
+    if conflicts:
+        raise CommandError(
+            "These emails belong to more than one account, differing only in case. Merge or "
+            "change them before migrating, so the unique Lower('email') constraints can be added:\n"
+            + "\n".join(conflicts)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0017_outbound_email'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_case_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='faculty',
+            constraint=models.UniqueConstraint(django.db.models.functions.text.Lower('email'), name='faculty_email_lower_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='pendingstudent',
+            constraint=models.UniqueConstraint(django.db.models.functions.text.Lower('email'), name='pending_email_lower_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='student',
+            constraint=models.UniqueConstraint(django.db.models.functions.text.Lower('email'), name='student_email_lower_uniq'),
+        ),
+    ]
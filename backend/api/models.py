@@ -1,10 +1,16 @@
 import uuid
 from django.db import models
+from django.db.models.functions import Lower
+from django.utils import timezone
+
+# Enables email__lower=... lookups, which use the unique Lower('email') constraints below
+models.CharField.register_lookup(Lower)
 
 class School(models.Model):
     name = models.CharField(max_length=255, unique=True)
     faculty_domain = models.CharField(max_length=255)
     student_domain = models.CharField(max_length=255)
+    updated_at = models.DateTimeField(auto_now=True)  # Version stamp for ETag/Last-Modified
 
     def __str__(self):
         return self.name
@@ -17,6 +23,11 @@ class Faculty(models.Model):
     school = models.ForeignKey(School, on_delete=models.CASCADE)
     email_verified = models.BooleanField(default=False)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(Lower('email'), name='faculty_email_lower_uniq'),
+        ]
+
     def __str__(self):
         return f"{self.first_name} {self.last_name}"
 
@@ -29,6 +40,11 @@ class Student(models.Model):
     school = models.ForeignKey(School, on_delete=models.CASCADE)
     email_verified = models.BooleanField(default=False)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(Lower('email'), name='student_email_lower_uniq'),
+        ]
+
     def __str__(self):
         return f"{self.first_name} {self.last_name}"
 
@@ -45,6 +61,9 @@ class PendingStudent(models.Model):
 
     class Meta:
         unique_together = ('school', 'student_id')  # Student IDs must be unique within a school
+        constraints = [
+            models.UniqueConstraint(Lower('email'), name='pending_email_lower_uniq'),
+        ]
 
     def __str__(self):
         return f"{self.first_name} {self.last_name} (Pending)"
@@ -54,6 +73,7 @@ class Class(models.Model):
     faculty = models.ForeignKey(Faculty, on_delete=models.CASCADE)
     school = models.ForeignKey(School, on_delete=models.CASCADE)
     semester = models.CharField(max_length=100, blank=True, null=True)  # New field for semester information
+    updated_at = models.DateTimeField(auto_now=True)  # Version stamp for ETag, along with the roster's memberships (see ClassViewSet.retrieve)
 
     def __str__(self):
         return self.name
@@ -86,6 +106,13 @@ class Event(models.Model):
     school = models.ForeignKey(School, on_delete=models.CASCADE)
     checkin_before_minutes = models.IntegerField(default=15)
     checkin_after_minutes = models.IntegerField(default=15)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['school', 'date'], name='event_school_date_idx'),
+            models.Index(fields=['faculty', 'date'], name='event_faculty_date_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -106,3 +133,43 @@ class Attendance(models.Model):
 
     class Meta:
         unique_together = ('student', 'event')
+        indexes = [
+            # A student's history, newest first (id breaks ties for keyset pagination)
+            models.Index(fields=['student', '-scanned_at', '-id'], name='attendance_student_scan_idx'),
+            # Per-event reports in scan order
+            models.Index(fields=['event', 'scanned_at'], name='attendance_event_scan_idx'),
+        ]
+
+# Outgoing email, delivered by the send_queued_mail management command
+class OutboundEmail(models.Model):
+    STATUS_PENDING = 'pending'
+    STATUS_SENDING = 'sending'
+    STATUS_SENT = 'sent'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_SENDING, 'Sending'),
+        (STATUS_SENT, 'Sent'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    html_body = models.TextField(blank=True, null=True)
+    from_email = models.CharField(max_length=255, blank=True, null=True)
+    recipients = models.JSONField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.IntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True, null=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)  # When a worker last took it for sending
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outbound_email_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} -> {', '.join(self.recipients)} ({self.status})"
@@ -0,0 +1,45 @@
+from rest_framework.pagination import CursorPagination
+
+
+# ---------------- Cursor Pagination ----------------
+class DefaultCursorPagination(CursorPagination):
+    """Cursor pagination that always applies, page_size rows at a time.
+
+    Used for whole-table lists (attendance, students, faculty) that no page
+    loads in full, so a bare GET can't pull the entire table.
+    """
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+    # Every model has a stable primary key; viewsets with a natural sort order
+    # (e.g. events by date) use a subclass instead
+    ordering = 'pk'
+
+
+# ---------------- Optional Cursor Pagination ----------------
+class OptionalCursorPagination(DefaultCursorPagination):
+    """Cursor pagination that only kicks in when the client asks for a page.
+
+    Existing callers that expect a plain list keep getting one; sending
+    ?page_size=<n> (or following a ?cursor= link) returns the paginated
+    {next, previous, results} envelope instead.
+    """
+
+    def paginate_queryset(self, queryset, request, view=None):
+        params = request.query_params
+        if self.cursor_query_param not in params and self.page_size_query_param not in params:
+            return None
+        return super().paginate_queryset(queryset, request, view)
+
+
+# ---------------- Event Pagination ----------------
+class EventCursorPagination(OptionalCursorPagination):
+    # Matches the (school, date) and (faculty, date) indexes on Event
+    ordering = ('date', 'id')
+
+
+# ---------------- Student Attendance Pagination ----------------
+class StudentAttendancePagination(OptionalCursorPagination):
+    # Newest first, walking the (student, -scanned_at, -id) index on Attendance
+    ordering = ('-scanned_at', '-id')
+    page_size = 50
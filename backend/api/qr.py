@@ -0,0 +1,136 @@
+"""QR code PDFs for events.
+
+The QR modules are drawn straight onto the ReportLab canvas as filled
+rectangles instead of rendering a PNG and re-reading it through PIL. Rendered
+PDFs are cached under a digest of everything printed on the page, so a cached
+copy can never disagree with the event it was rendered for.
+"""
+import hashlib
+import io
+import json
+
+import qrcode
+from django.core.cache import cache
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.units import inch
+from reportlab.pdfgen import canvas
+
+ATTENDANCE_URL = "https://trueattend.onrender.com/attend/{event_id}"
+
+# Bump when the page layout changes so previously cached PDFs are not reused
+LAYOUT_VERSION = 1
+CACHE_TIMEOUT = 60 * 60 * 24 * 7
+CACHE_PREFIX = 'event_qr_pdf'
+QR_MASK_PATTERN = 0
+
+
+def event_qr_fields(event):
+    """Everything printed on an event's QR page, as plain strings"""
+    return {
+        'id': str(event.id),
+        'name': event.name,
+        'date': event.date.strftime('%B %d, %Y'),
+        'start_time': event.date.strftime('%I:%M %p'),
+        'end_time': event.end_time.strftime('%I:%M %p') if event.end_time else None,
+        'location': event.location,
+    }
+
+
+def _qr_matrix(data):
+    # Any mask pattern is valid; fixing one skips qrcode's trial encoding of all
+    # eight, which is most of the cost of building the matrix
+    qr = qrcode.QRCode(
+        version=1,
+        error_correction=qrcode.constants.ERROR_CORRECT_L,
+        box_size=10,
+        border=4,
+        mask_pattern=QR_MASK_PATTERN,
+    )
+    qr.add_data(data)
+    qr.make(fit=True)
+    return qr.get_matrix()
+
+
+def _draw_qr(pdf, matrix, x, y, size):
+    """Draw a QR matrix as one filled path, merging horizontal runs of dark modules"""
+    count = len(matrix)
+    pdf.saveState()
+    # Work in module units with the origin at the top-left module, so every
+    # rectangle has integer coordinates and can be written as plain PDF operators
+    # instead of going through ReportLab's float formatting for each one
+    pdf.translate(x, y + size)
+    pdf.scale(size / count, -size / count)
+    pdf.setFillColorRGB(0, 0, 0)
+    operators = []
+    for row_index, row in enumerate(matrix):
+        col = 0
+        while col < count:
+            if not row[col]:
+                col += 1
+                continue
+            start = col
+            while col < count and row[col]:
+                col += 1
+            operators.append(f"{start} {row_index} {col - start} 1 re")
+    operators.append("f")
+    pdf.addLiteral("\n".join(operators))
+    pdf.restoreState()
+
+
+def draw_event_qr_page(pdf, fields):
+    """Draw one event's details and QR code on the current page"""
+    pdf.setFont("Helvetica-Bold", 16)
+    pdf.drawString(1*inch, 10*inch, f"Event: {fields['name']}")
+    pdf.setFont("Helvetica", 12)
+    pdf.drawString(1*inch, 9.5*inch, f"Date: {fields['date']}")
+    if fields['end_time']:
+        pdf.drawString(1*inch, 9.0*inch, f"Time: {fields['start_time']} - {fields['end_time']}")
+    else:
+        pdf.drawString(1*inch, 9.0*inch, f"Time: {fields['start_time']}")
+    if fields['location']:
+        pdf.drawString(1*inch, 8.5*inch, f"Location: {fields['location']}")
+    pdf.setFont("Helvetica-Bold", 14)
+    pdf.drawString(1*inch, 8.0*inch, "Instructions:")
+    pdf.setFont("Helvetica", 12)
+    pdf.drawString(1*inch, 7.5*inch, "1. Print this QR code and display it in class")
+    pdf.drawString(1*inch, 7.0*inch, "2. Have students scan this code with the ClassAttend app")
+    pdf.drawString(1*inch, 6.5*inch, "3. Students must be logged in to record attendance")
+    matrix = _qr_matrix(ATTENDANCE_URL.format(event_id=fields['id']))
+    _draw_qr(pdf, matrix, 2.5*inch, 2*inch, 4*inch)
+
+
+def render_event_qr_pdf(pages):
+    """Render one or more events' QR pages into a single PDF and return its bytes"""
+    buffer = io.BytesIO()
+    pdf = canvas.Canvas(buffer, pagesize=letter)
+    for fields in pages:
+        draw_event_qr_page(pdf, fields)
+        pdf.showPage()
+    pdf.save()
+    return buffer.getvalue()
+
+
+def _digest(fields):
+    payload = json.dumps([LAYOUT_VERSION, fields], sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def get_event_qr_pdf(event):
+    """Return the QR PDF for an event, rendering it only if it isn't cached"""
+    fields = event_qr_fields(event)
+    key = f"{CACHE_PREFIX}:{_digest(fields)}"
+    pdf_bytes = cache.get(key)
+    if pdf_bytes is None:
+        pdf_bytes = render_event_qr_pdf([fields])
+        cache.set(key, pdf_bytes, CACHE_TIMEOUT)
+        # Remember which digest belongs to the event so a save can evict it
+        cache.set(f"{CACHE_PREFIX}:event:{fields['id']}", key, CACHE_TIMEOUT)
+    return pdf_bytes
+
+
+def forget_event_qr_pdf(event_id):
+    """Evict the cached PDF of an event whose display fields may have changed"""
+    pointer = f"{CACHE_PREFIX}:event:{event_id}"
+    key = cache.get(pointer)
+    if key is not None:
+        cache.delete_many([key, pointer])
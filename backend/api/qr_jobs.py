@@ -0,0 +1,152 @@
+"""Background rendering of multi-event QR sheets.
+
+A sheet for a whole semester can run to dozens of pages, so it is rendered in a
+process pool instead of inside the request. Each job is tracked by a small JSON
+status file next to its PDF in QR_JOB_DIR, which any web worker can read, so
+the client can poll whichever worker it reaches and download the result once
+the job is done. A job that is lost with its pool (a crashed pool process or a
+restarted web worker) is reported as failed, either straight away when the pool
+breaks or once it has been unfinished for QR_JOB_TIMEOUT seconds.
+
+This module avoids importing models so pool processes can load it cheaply.
+"""
+import json
+import multiprocessing
+import os
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+
+from .qr import render_event_qr_pdf
+
+JOB_ID_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+
+def _write_json(path, data):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+def _status_path(job_dir, job_id):
+    return os.path.join(job_dir, f"{job_id}.json")
+
+
+def pdf_path(job_id):
+    return os.path.join(settings.QR_JOB_DIR, f"{job_id}.pdf")
+
+
+def _render_job(job_dir, job_id, pages, created_at):
+    """Runs in a pool process: render the sheet and record the outcome"""
+    status_path = _status_path(job_dir, job_id)
+    status = {'job_id': job_id, 'pages': len(pages), 'created_at': created_at}
+    try:
+        _write_json(status_path, {**status, 'status': 'running'})
+        output = os.path.join(job_dir, f"{job_id}.pdf")
+        with open(f"{output}.tmp", 'wb') as f:
+            f.write(render_event_qr_pdf(pages))
+        os.replace(f"{output}.tmp", output)
+        _write_json(status_path, {**status, 'status': 'done'})
+    except Exception as e:
+        _write_json(status_path, {**status, 'status': 'failed', 'error': str(e)})
+
+
+def _get_executor():
+    global _executor, _executor_pid
+    with _executor_lock:
+        # Pools don't survive a fork, so every web worker starts its own
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ProcessPoolExecutor(
+                max_workers=settings.QR_JOB_WORKERS,
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+            _executor_pid = os.getpid()
+        return _executor
+
+
+def _discard_executor(executor):
+    """Forget a broken pool so the next job starts a fresh one"""
+    global _executor
+    with _executor_lock:
+        if _executor is executor:
+            _executor = None
+    executor.shutdown(wait=False)
+
+
+def _fail_job(status_path, status, error):
+    _write_json(status_path, {**status, 'status': 'failed', 'error': error})
+
+
+def _prune_old_jobs(job_dir):
+    cutoff = time.time() - settings.QR_JOB_TTL
+    for name in os.listdir(job_dir):
+        path = os.path.join(job_dir, name)
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+        except FileNotFoundError:
+            continue
+
+
+def submit_qr_sheet(pages):
+    """Queue a multi-page QR sheet for rendering and return its job id"""
+    job_dir = settings.QR_JOB_DIR
+    os.makedirs(job_dir, exist_ok=True)
+    _prune_old_jobs(job_dir)
+
+    job_id = uuid.uuid4().hex
+    status_path = _status_path(job_dir, job_id)
+    status = {'job_id': job_id, 'pages': len(pages), 'created_at': time.time()}
+    _write_json(status_path, {**status, 'status': 'pending'})
+
+    executor = _get_executor()
+    try:
+        future = executor.submit(_render_job, job_dir, job_id, pages, status['created_at'])
+    except BrokenProcessPool:
+        # A pool process died earlier; retry once on a new pool
+        _discard_executor(executor)
+        executor = _get_executor()
+        try:
+            future = executor.submit(_render_job, job_dir, job_id, pages, status['created_at'])
+        except BrokenProcessPool as e:
+            _discard_executor(executor)
+            _fail_job(status_path, status, f"Rendering pool is unavailable: {e}")
+            return job_id
+
+    def check_outcome(future):
+        # _render_job records its own errors, so an exception here means the pool broke under the job
+        error = 'cancelled' if future.cancelled() else future.exception()
+        if error is not None:
+            _discard_executor(executor)
+            _fail_job(status_path, status, f"Rendering pool failed: {error}")
+
+    future.add_done_callback(check_outcome)
+    return job_id
+
+
+def get_job(job_id):
+    """Return a job's status dict, or None if there is no such job"""
+    if not JOB_ID_PATTERN.match(job_id):
+        return None
+    status_path = _status_path(settings.QR_JOB_DIR, job_id)
+    try:
+        with open(status_path, 'r', encoding='utf-8') as f:
+            job = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+    # The worker that owned the pool may have been restarted, leaving nobody to finish the job
+    if job.get('status') in ('pending', 'running') and time.time() - job.get('created_at', 0) > settings.QR_JOB_TIMEOUT:
+        job = {**job, 'status': 'failed', 'error': 'Timed out waiting for the sheet to render'}
+        _write_json(status_path, job)
+    return job
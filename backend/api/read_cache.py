@@ -0,0 +1,137 @@
+"""Read-through cache for hot read endpoints.
+
+Serialized payloads (event detail, schools, class rosters) are cached under a
+namespace and key. By default they live in a bounded in-process LRU; set
+READ_CACHE_ALIAS to the name of a Django cache (e.g. Redis) to share them
+between processes instead, in which case that backend does the eviction.
+
+Writes invalidate through the signals in signals.py, once the transaction
+commits. With the in-process cache that only reaches the process that made
+the write, so READ_CACHE_TTL bounds how stale the other workers can get.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+_lock = threading.Lock()
+_entries = OrderedDict()
+_counters = {}
+_evictions = 0
+
+
+def _shared():
+    alias = settings.READ_CACHE_ALIAS
+    return caches[alias] if alias else None
+
+
+def _full_key(namespace, key):
+    return f"read:{namespace}:{key}"
+
+
+def _count(namespace, hit):
+    with _lock:
+        counter = _counters.setdefault(namespace, {'hits': 0, 'misses': 0})
+        counter['hits' if hit else 'misses'] += 1
+
+
+def _local_get(full_key):
+    with _lock:
+        entry = _entries.get(full_key)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            del _entries[full_key]
+            return None
+        _entries.move_to_end(full_key)
+        return entry[1]
+
+
+def _local_set(full_key, value):
+    global _evictions
+    with _lock:
+        _entries[full_key] = (time.monotonic() + settings.READ_CACHE_TTL, value)
+        _entries.move_to_end(full_key)
+        while len(_entries) > settings.READ_CACHE_MAX_ENTRIES:
+            _entries.popitem(last=False)
+            _evictions += 1
+
+
+def cached(namespace, key, load):
+    """Return the cached value, or call load() and cache what it returns (None isn't cached)"""
+    full_key = _full_key(namespace, key)
+    shared = _shared()
+    value = shared.get(full_key) if shared else _local_get(full_key)
+    _count(namespace, value is not None)
+    if value is None:
+        value = load()
+        if value is not None:
+            if shared:
+                shared.set(full_key, value, settings.READ_CACHE_TTL)
+            else:
+                _local_set(full_key, value)
+    return value
+
+
+async def acached(namespace, key, aload):
+    """Async version of cached; aload is a coroutine function"""
+    full_key = _full_key(namespace, key)
+    shared = _shared()
+    # BaseCache.aget/aset go through the one thread-sensitive thread
+    value = await sync_to_async(shared.get, thread_sensitive=False)(full_key) if shared else _local_get(full_key)
+    _count(namespace, value is not None)
+    if value is None:
+        value = await aload()
+        if value is not None:
+            if shared:
+                await sync_to_async(shared.set, thread_sensitive=False)(full_key, value, settings.READ_CACHE_TTL)
+            else:
+                _local_set(full_key, value)
+    return value
+
+
+def forget(namespace, *keys):
+    """Drop cached values once the current transaction commits"""
+    full_keys = [_full_key(namespace, key) for key in keys]
+    if not full_keys:
+        return
+
+    def drop():
+        shared = _shared()
+        if shared:
+            shared.delete_many(full_keys)
+        else:
+            with _lock:
+                for full_key in full_keys:
+                    _entries.pop(full_key, None)
+
+    transaction.on_commit(drop)
+
+
+def clear():
+    """Empty the in-process cache and reset the counters"""
+    global _evictions
+    with _lock:
+        _entries.clear()
+        _counters.clear()
+        _evictions = 0
+
+
+def stats():
+    """Hit and miss counts per namespace for this process"""
+    with _lock:
+        namespaces = {}
+        for namespace, counter in _counters.items():
+            total = counter['hits'] + counter['misses']
+            namespaces[namespace] = dict(counter, hit_rate=round(counter['hits'] / total, 4) if total else None)
+        return {
+            'backend': settings.READ_CACHE_ALIAS or 'local',
+            'entries': len(_entries),
+            'max_entries': settings.READ_CACHE_MAX_ENTRIES,
+            'evictions': _evictions,
+            'namespaces': namespaces,
+        }
@@ -0,0 +1,129 @@
+"""Merge pending students into the registered students they turned out to be.
+
+A pending student matches a registered student of the same school with the
+same email (ignoring case) or the same student ID. Matches are handled a batch
+at a time: class memberships are moved over with one UPDATE, memberships the
+student already has are dropped, and the pending rows are deleted. Each batch
+commits on its own, so the job can be stopped and re-run at any point.
+"""
+import time
+
+from django.db import models, transaction
+from django.db.models import Case, Q, Value, When
+from django.db.models.functions import Lower
+
+from .lookups import normalize_email
+from .models import ClassStudent, PendingStudent, Student
+from .roster import forget_rosters
+
+DEFAULT_BATCH_SIZE = 1000
+
+
+def _match_batch(school_id, batch):
+    """Map pending student ids to the registered student each one matches"""
+    emails = {normalize_email(row['email']): row['id'] for row in batch}
+    student_ids = {}
+    for row in batch:
+        if row['student_id']:
+            student_ids.setdefault(row['student_id'], []).append(row['id'])
+
+    matches = {}
+    by_student_id = {}
+    registered = (
+        Student.objects.filter(school_id=school_id)
+        .filter(Q(email__lower__in=list(emails)) | Q(student_id__in=list(student_ids)))
+        .annotate(email_lower=Lower('email'))
+        .values_list('id', 'email_lower', 'student_id')
+    )
+    for pk, email_lower, student_id in registered:
+        if email_lower in emails:
+            matches[emails[email_lower]] = pk
+        for pending_id in student_ids.get(student_id, ()):
+            by_student_id[pending_id] = pk
+    # An email match wins over a student ID match
+    for pending_id, pk in by_student_id.items():
+        matches.setdefault(pending_id, pk)
+    return matches
+
+
+def _merge_batch(matches):
+    """Move class memberships to the matched students and drop the pending rows"""
+    memberships = list(
+        ClassStudent.objects.filter(pending_student_id__in=list(matches))
+        .values_list('id', 'class_instance_id', 'pending_student_id')
+    )
+    enrolled = set(
+        ClassStudent.objects.filter(student_id__in=set(matches.values()))
+        .values_list('class_instance_id', 'student_id')
+    )
+
+    duplicates = []
+    moved = []
+    for pk, class_id, pending_id in memberships:
+        key = (class_id, matches[pending_id])
+        if key in enrolled:
+            duplicates.append(pk)
+        else:
+            enrolled.add(key)
+            moved.append(pending_id)
+
+    if duplicates:
+        ClassStudent.objects.filter(pk__in=duplicates).delete()
+    if moved:
+        moved = set(moved)
+        ClassStudent.objects.filter(pending_student_id__in=moved).update(
+            student_id=Case(
+                *[When(pending_student_id=pending_id, then=Value(matches[pending_id])) for pending_id in moved],
+                output_field=models.UUIDField(),
+            ),
+            pending_student=None,
+        )
+    PendingStudent.objects.filter(pk__in=list(matches)).delete()
+    # The UPDATE above sends no signals
+    forget_rosters({class_id for _, class_id, _ in memberships})
+    return len(memberships) - len(duplicates), len(duplicates)
+
+
+def reconcile_pending_students(pending=None, batch_size=DEFAULT_BATCH_SIZE, progress=None):
+    """Reconcile pending students (all of them, or the given queryset) school by school.
+
+    Returns the totals as a dict. If progress is given it is called with the
+    totals of each school as it finishes.
+    """
+    pending = PendingStudent.objects.all() if pending is None else pending
+    totals = {'schools': 0, 'scanned': 0, 'matched': 0, 'memberships_moved': 0, 'memberships_dropped': 0, 'seconds': 0.0}
+    started = time.monotonic()
+
+    school_ids = pending.order_by('school_id').values_list('school_id', flat=True).distinct()
+    for school_id in list(school_ids):
+        school_started = time.monotonic()
+        stats = {'school': school_id, 'scanned': 0, 'matched': 0, 'memberships_moved': 0, 'memberships_dropped': 0}
+        last_id = None
+        while True:
+            # Keyset pagination, so each batch is an index range scan however far in we are
+            batch_query = pending.filter(school_id=school_id).order_by('id')
+            if last_id is not None:
+                batch_query = batch_query.filter(id__gt=last_id)
+            batch = list(batch_query.values('id', 'email', 'student_id')[:batch_size])
+            if not batch:
+                break
+            last_id = batch[-1]['id']
+            stats['scanned'] += len(batch)
+
+            with transaction.atomic():
+                matches = _match_batch(school_id, batch)
+                if matches:
+                    moved, dropped = _merge_batch(matches)
+                    stats['matched'] += len(matches)
+                    stats['memberships_moved'] += moved
+                    stats['memberships_dropped'] += dropped
+
+        stats['seconds'] = time.monotonic() - school_started
+        totals['schools'] += 1
+        for key in ('scanned', 'matched', 'memberships_moved', 'memberships_dropped'):
+            totals[key] += stats[key]
+        if progress:
+            progress(stats)
+
+    totals['seconds'] = time.monotonic() - started
+    return totals
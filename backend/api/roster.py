@@ -0,0 +1,307 @@
+"""Set-based roster imports.
+
+A whole class list is resolved with one IN query against registered students
+and one against pending students, then written with bulk_create/bulk_update in
+a single transaction, instead of several queries per student.
+"""
+import csv
+import io
+import re
+from uuid import UUID
+
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import transaction
+from django.db.models import Q
+
+from .lookups import normalize_email
+from .models import ClassStudent, PendingStudent, Student
+from .read_cache import forget
+
+# Accepted spellings of each column, compared after lower-casing and dropping
+# everything but letters and digits ("First Name", "firstName", "first_name")
+_COLUMN_ALIASES = {
+    'email': 'email',
+    'emailaddress': 'email',
+    'firstname': 'first_name',
+    'lastname': 'last_name',
+    'studentid': 'student_id',
+}
+
+
+def _column(name):
+    return _COLUMN_ALIASES.get(re.sub(r'[^a-z0-9]', '', str(name).lower()))
+
+
+def normalize_entry(entry):
+    """Map a roster row with any accepted key spelling onto the model field names"""
+    row = {}
+    for key, value in entry.items():
+        field = _column(key)
+        if field and field not in row:
+            row[field] = (value or '').strip() if isinstance(value, str) else value
+    return row
+
+
+def parse_roster_csv(text):
+    """Parse an uploaded roster; the header row names the columns"""
+    reader = csv.DictReader(io.StringIO(text.lstrip('\ufeff')))
+    rows = []
+    for row in reader:
+        # Fields beyond the header are collected as a list under the None key
+        row.pop(None, None)
+        if any((value or '').strip() for value in row.values()):
+            rows.append(row)
+    return rows
+
+
+def _row_error(row):
+    """Why a normalized row can't be imported, or None if it can"""
+    if not row.get('email'):
+        return 'Email is required'
+    for field in ('email', 'first_name', 'last_name', 'student_id'):
+        value = row.get(field)
+        if value is None:
+            continue
+        if not isinstance(value, str):
+            return f'{field} must be text'
+        max_length = PendingStudent._meta.get_field(field).max_length
+        if len(value) > max_length:
+            return f'{field} must be at most {max_length} characters'
+    try:
+        validate_email(row['email'])
+    except ValidationError:
+        return 'Enter a valid email address'
+    return None
+
+
+def _prepare_rows(entries, results):
+    """Normalize entries, recording a result for each and dropping unusable rows.
+
+    Rows are validated here, before anything is written, so a malformed row
+    is reported as an error instead of failing the whole import.
+    """
+    rows = []
+    seen = set()
+    for entry in entries:
+        row = normalize_entry(entry) if isinstance(entry, dict) else {}
+        email = row.get('email') or ''
+        result = {'row': len(results) + 1, 'email': email}
+        results.append(result)
+        error = _row_error(row)
+        if error:
+            result.update(status='error', error=error)
+            continue
+        if email.lower() in seen:
+            result['status'] = 'duplicate'
+            continue
+        seen.add(email.lower())
+        rows.append((row, result))
+    return rows
+
+
+def _resolve_rows(faculty, rows):
+    """Find or create the student behind every row.
+
+    Returns (student, result) pairs, where student is a Student or a
+    PendingStudent. Rows that can't be added get an error result and are left
+    out. Must run inside a transaction.
+    """
+    # Emails are matched ignoring case, through the unique Lower('email') constraints
+    emails = [normalize_email(row['email']) for row, _ in rows]
+    registered = {
+        normalize_email(student.email): student
+        for student in Student.objects.filter(email__lower__in=emails).only('id', 'email')
+    }
+    pending = {
+        normalize_email(student.email): student
+        for student in PendingStudent.objects.filter(email__lower__in=[e for e in emails if e not in registered])
+    }
+
+    # Student IDs are unique per school, so check the new pending rows
+    # against the ones already taken before inserting anything
+    new_rows = [
+        row for row, _ in rows
+        if normalize_email(row['email']) not in registered and normalize_email(row['email']) not in pending
+    ]
+    taken_ids = set(
+        PendingStudent.objects.filter(
+            school_id=faculty.school_id,
+            student_id__in=[row.get('student_id') or '' for row in new_rows],
+        ).values_list('student_id', flat=True)
+    ) if new_rows else set()
+
+    resolved = []
+    to_update = []
+    to_create = []
+    for row, result in rows:
+        email = normalize_email(row['email'])
+        if email in registered:
+            student = registered[email]
+            result.update(student_type='registered', id=str(student.id), created=False)
+            resolved.append((student, result))
+            continue
+
+        if email in pending:
+            student = pending[email]
+            changed = False
+            for field in ('first_name', 'last_name', 'student_id'):
+                value = row.get(field)
+                if value and getattr(student, field) != value:
+                    setattr(student, field, value)
+                    changed = True
+            if changed:
+                to_update.append(student)
+            created = False
+        else:
+            student_id = row.get('student_id') or ''
+            if student_id in taken_ids:
+                result.update(status='error', error=f'Student ID "{student_id}" is already in use at this school')
+                continue
+            taken_ids.add(student_id)
+            student = PendingStudent(
+                first_name=row.get('first_name') or '',
+                last_name=row.get('last_name') or '',
+                student_id=student_id,
+                email=row['email'],
+                school_id=faculty.school_id,
+                added_by=faculty,
+            )
+            to_create.append(student)
+            created = True
+
+        result.update(student_type='pending', id=str(student.id), created=created)
+        resolved.append((student, result))
+
+    if to_update:
+        PendingStudent.objects.bulk_update(to_update, ['first_name', 'last_name', 'student_id'])
+        # bulk_update sends no signals, and renamed students show on other rosters too
+        forget_rosters(pending_students=[student.id for student in to_update])
+    if to_create:
+        PendingStudent.objects.bulk_create(to_create)
+    return resolved
+
+
+def forget_rosters(class_ids=(), students=(), pending_students=()):
+    """Invalidate the cached rosters of these classes and of every class the given students are in"""
+    class_ids = set(class_ids)
+    if students or pending_students:
+        class_ids.update(
+            ClassStudent.objects.filter(Q(student_id__in=list(students)) | Q(pending_student_id__in=list(pending_students)))
+            .values_list('class_instance_id', flat=True)
+        )
+    forget('roster', *class_ids)
+
+
+def _membership(class_instance, student):
+    if isinstance(student, Student):
+        return ClassStudent(class_instance=class_instance, student=student)
+    return ClassStudent(class_instance=class_instance, pending_student=student)
+
+
+def import_roster(class_instance, faculty, entries):
+    """Add every entry to the class and return per-row outcomes.
+
+    Each result has the row number, the email and a status of ``enrolled``,
+    ``already_enrolled``, ``duplicate`` (the email appeared earlier in the
+    upload) or ``error``.
+    """
+    results = []
+    rows = _prepare_rows(entries, results)
+    if not rows:
+        return results
+
+    with transaction.atomic():
+        resolved = _resolve_rows(faculty, rows)
+        enrolled = set(
+            ClassStudent.objects.filter(class_instance=class_instance)
+            .values_list('student_id', 'pending_student_id')
+        )
+        enrolled_ids = {pk for pair in enrolled for pk in pair if pk is not None}
+
+        memberships = []
+        for student, result in resolved:
+            if student.id in enrolled_ids:
+                result['status'] = 'already_enrolled'
+                continue
+            memberships.append(_membership(class_instance, student))
+            result['status'] = 'enrolled'
+        if memberships:
+            ClassStudent.objects.bulk_create(memberships, ignore_conflicts=True)
+            forget_rosters([class_instance.id])
+
+    return results
+
+
+def sync_roster(class_instance, faculty, items):
+    """Make the class roster exactly match items, touching only what changed.
+
+    Items are either ids of registered/pending students or roster entries
+    with an email. Memberships that are already in place are left alone; the
+    rest are added with one bulk insert and removed with one delete. Entry
+    results get a status of ``enrolled`` or ``unchanged`` (already on the
+    roster), or ``duplicate``/``error`` as in import_roster.
+    """
+    ids = set()
+    entries = []
+    for item in items:
+        if isinstance(item, str):
+            try:
+                ids.add(UUID(item))
+            except ValueError:
+                print(f"Skipping invalid student ID {item}")
+        elif isinstance(item, dict):
+            entries.append(item)
+
+    results = []
+    rows = _prepare_rows(entries, results)
+
+    with transaction.atomic():
+        wanted = {}
+        entry_keys = []
+        if ids:
+            for student in Student.objects.filter(id__in=ids).only('id'):
+                wanted[('student', student.id)] = student
+            missing = ids - {pk for _, pk in wanted}
+            if missing:
+                for student in PendingStudent.objects.filter(id__in=missing).only('id'):
+                    wanted[('pending', student.id)] = student
+        if rows:
+            for student, result in _resolve_rows(faculty, rows):
+                kind = 'student' if isinstance(student, Student) else 'pending'
+                wanted[(kind, student.id)] = student
+                entry_keys.append(((kind, student.id), result))
+
+        current = {}
+        for pk, student_id, pending_student_id in (
+            ClassStudent.objects.filter(class_instance=class_instance)
+            .values_list('id', 'student_id', 'pending_student_id')
+        ):
+            key = ('student', student_id) if student_id else ('pending', pending_student_id)
+            current[key] = pk
+
+        for key, result in entry_keys:
+            result['status'] = 'unchanged' if key in current else 'enrolled'
+
+        removed = [pk for key, pk in current.items() if key not in wanted]
+        added = [_membership(class_instance, student) for key, student in wanted.items() if key not in current]
+        if removed:
+            ClassStudent.objects.filter(pk__in=removed).delete()
+        if added:
+            ClassStudent.objects.bulk_create(added)
+            forget_rosters([class_instance.id])
+
+    return {
+        'added': len(added),
+        'removed': len(removed),
+        'unchanged': len(current) - len(removed),
+        'results': results,
+    }
+
+
+def summarize(results):
+    """Count the results of an import by status"""
+    summary = {'enrolled': 0, 'already_enrolled': 0, 'duplicate': 0, 'error': 0}
+    for result in results:
+        summary[result['status']] += 1
+    return summary
@@ -1,23 +1,77 @@
 from rest_framework import serializers
 from .models import School, Student, Faculty, Event, Class, Attendance, PendingStudent, ClassStudent, ClassEvent
+from .checkin import CheckInError, ensure_check_in_open, get_event_snapshot
+from .lookups import normalize_email
+
+# ---------------- Sparse Fieldsets ----------------
+class SparseFieldsetMixin:
+    """Lets GET requests ask for a subset of fields, e.g. ?fields=id,name"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if request is None or request.method not in ('GET', 'HEAD'):
+            return
+        requested = request.query_params.get('fields')
+        if not requested:
+            return
+        keep = {name.strip() for name in requested.split(',')}
+        for name in set(self.fields) - keep:
+            self.fields.pop(name)
+
+
+def sparse_fields(data, requested):
+    """Apply ?fields= to a payload that was serialized in full, e.g. one from the read cache"""
+    if not requested:
+        return data
+    keep = {name.strip() for name in requested.split(',')}
+    return {name: value for name, value in data.items() if name in keep}
+
+class UniqueEmailValidator:
+    """UniqueValidator for emails, ignoring case.
+
+    Filters on email__lower so the check uses the unique Lower('email')
+    constraint (iexact compiles to UPPER() and would scan the table), and a
+    case variant is a 400 instead of an IntegrityError.
+    """
+    requires_context = True
+
+    def __init__(self, queryset):
+        self.queryset = queryset
+
+    def __call__(self, value, serializer_field):
+        queryset = self.queryset.filter(email__lower=normalize_email(value))
+        instance = getattr(serializer_field.parent, 'instance', None)
+        if instance is not None:
+            queryset = queryset.exclude(pk=instance.pk)
+        if queryset.exists():
+            raise serializers.ValidationError(
+                f"{self.queryset.model._meta.verbose_name} with this email already exists.", code='unique'
+            )
+
+
+def unique_email(model):
+    return {'validators': [UniqueEmailValidator(queryset=model.objects.all())]}
 
 # ---------------- School Serializer ----------------
-class SchoolSerializer(serializers.ModelSerializer):
+class SchoolSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = School
         fields = ['id', 'name', 'faculty_domain', 'student_domain']
 
 # ---------------- Student Serializer ----------------
-class StudentSerializer(serializers.ModelSerializer):
+class StudentSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Student
         fields = ['id', 'student_id', 'first_name', 'last_name', 'email', 'email_verified', 'school']
+        extra_kwargs = {'email': unique_email(Student)}
 
 # ---------------- Student Registration Serializer ----------------
 class StudentRegistrationSerializer(serializers.ModelSerializer):
     class Meta:
         model = Student
         fields = ['student_id', 'first_name', 'last_name', 'email', 'school']
+        extra_kwargs = {'email': unique_email(Student)}
         
     def validate_email(self, value):
         school_id = self.initial_data.get('school')
@@ -32,10 +86,11 @@ class StudentRegistrationSerializer(serializers.ModelSerializer):
         return value 
 
 # ---------------- Faculty Serializer ----------------
-class FacultySerializer(serializers.ModelSerializer):
+class FacultySerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Faculty
         fields = ['first_name', 'last_name', 'email', 'school']
+        extra_kwargs = {'email': unique_email(Faculty)}
 
     def validate_email(self, value):
         school_id = self.initial_data.get('school')
@@ -54,6 +109,7 @@ class FacultyRegistrationSerializer(serializers.ModelSerializer):
     class Meta:
         model = Faculty
         fields = ['first_name', 'last_name', 'email', 'school']
+        extra_kwargs = {'email': unique_email(Faculty)}
         
     def validate_email(self, value):
         school_id = self.initial_data.get('school')
@@ -68,21 +124,22 @@ class FacultyRegistrationSerializer(serializers.ModelSerializer):
         return value
 
 # ---------------- Event Serializer ----------------
-class EventSerializer(serializers.ModelSerializer):
+class EventSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Event
         fields = ['id', 'name', 'description', 'date', 'end_time', 'location', 'faculty', 'school', 
                  'checkin_before_minutes', 'checkin_after_minutes']
 
 # ---------------- Pending Student Serializer ----------------
-class PendingStudentSerializer(serializers.ModelSerializer):
+class PendingStudentSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = PendingStudent
         fields = ['id', 'first_name', 'last_name', 'email', 'student_id', 'school', 'added_by', 'created_at']
+        extra_kwargs = {'email': unique_email(PendingStudent)}
         read_only_fields = ['id', 'created_at']
 
 # ---------------- Class Student Serializer ----------------
-class ClassStudentSerializer(serializers.ModelSerializer):
+class ClassStudentSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     student_info = serializers.SerializerMethodField()
     
     class Meta:
@@ -111,7 +168,7 @@ class ClassStudentSerializer(serializers.ModelSerializer):
         return None
 
 # ---------------- Class Serializer ----------------
-class ClassSerializer(serializers.ModelSerializer):    
+class ClassSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     students = serializers.SerializerMethodField()
 
     class Meta:
@@ -119,29 +176,34 @@ class ClassSerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'faculty', 'school', 'students', 'semester']
         
     def get_students(self, obj):
-        # Get all ClassStudent associations for this class
-        class_students = ClassStudent.objects.filter(class_instance=obj)
-        student_ids = []
-        
-        # Include both regular students and pending students
-        for cs in class_students:
-            if cs.student:
-                student_ids.append(str(cs.student.id))
-            elif cs.pending_student:
-                student_ids.append(str(cs.pending_student.id))
-        
-        # Debug output to see what IDs we're returning
-        print(f"Class {obj.id} has students: {student_ids}")
-        return student_ids
+        # Include both regular students and pending students. Only the raw FK
+        # columns are read, so no Student/PendingStudent rows are loaded; the
+        # ClassViewSet prefetches these for every class in a single query.
+        return [
+            str(cs.student_id or cs.pending_student_id)
+            for cs in obj.students.all()
+        ]
 
 # ---------------- Attendance Serializer ----------------
-class AttendanceSerializer(serializers.ModelSerializer):
+class AttendanceSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Attendance
         fields = ['id', 'student', 'event', 'scanned_at', 'location', 'device_id']
 
+    def validate(self, attrs):
+        # New scans through the generic endpoint get the same window check as check-in
+        if self.instance is None and 'event' in attrs:
+            try:
+                ensure_check_in_open(get_event_snapshot(attrs['event'].pk))
+            except CheckInError as e:
+                raise serializers.ValidationError(e.errors)
+        return attrs
+
 # ---------------- Class Event Serializer ----------------
-class ClassEventSerializer(serializers.ModelSerializer):
+class ClassEventSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    # Embedded so a class page doesn't need one /events/<id>/ call per session
+    event_details = EventSerializer(source='event', read_only=True)
+
     class Meta:
         model = ClassEvent
-        fields = ['id', 'class_instance', 'event']
+        fields = ['id', 'class_instance', 'event', 'event_details']
@@ -0,0 +1,53 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .checkin import forget_event_snapshot
+from .live import attendance_message, publish_attendance
+from .models import Attendance, ClassStudent, Event, PendingStudent, School, Student
+from .qr import forget_event_qr_pdf
+from .read_cache import forget
+from .roster import forget_rosters
+
+
+# ---------------- Event cache invalidation ----------------
+@receiver(post_save, sender=Event)
+@receiver(post_delete, sender=Event)
+def invalidate_event_caches(sender, instance, **kwargs):
+    forget_event_qr_pdf(instance.pk)
+    forget_event_snapshot(instance.pk)
+    forget('event', instance.pk)
+
+
+# ---------------- Read cache invalidation ----------------
+@receiver(post_save, sender=School)
+@receiver(post_delete, sender=School)
+def invalidate_school_cache(sender, instance, **kwargs):
+    forget('school', instance.pk)
+    forget('schools', 'all')
+
+
+@receiver(post_save, sender=ClassStudent)
+@receiver(post_delete, sender=ClassStudent)
+def invalidate_roster_of_membership(sender, instance, **kwargs):
+    forget_rosters([instance.class_instance_id])
+
+
+@receiver(post_save, sender=Student)
+def invalidate_rosters_of_student(sender, instance, created, **kwargs):
+    # A new student isn't on any roster yet; deletes cascade to ClassStudent
+    if not created:
+        forget_rosters(students=[instance.pk])
+
+
+@receiver(post_save, sender=PendingStudent)
+def invalidate_rosters_of_pending_student(sender, instance, created, **kwargs):
+    if not created:
+        forget_rosters(pending_students=[instance.pk])
+
+
+# ---------------- Live attendance feed ----------------
+@receiver(post_save, sender=Attendance)
+def publish_new_attendance(sender, instance, created, **kwargs):
+    # The check-in fast path inserts with raw SQL and publishes on its own
+    if created:
+        publish_attendance([attendance_message(instance.pk, instance.student_id, instance.event_id, instance.scanned_at)])
@@ -0,0 +1,664 @@
+import json
+import os
+import tempfile
+import time
+import warnings
+from datetime import timedelta
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from smtplib import SMTPConnectError, SMTPRecipientsRefused
+from unittest import mock, skipUnless
+
+from django.core import mail
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.mail.backends.base import BaseEmailBackend
+from django.db import DatabaseError, IntegrityError, connection, transaction
+from django.test import AsyncClient, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from rest_framework.test import APIClient
+
+from api import qr_jobs, read_cache
+from api.attendance_buffer import WriteBehindBuffer, replay_orphaned_spools
+from api.checkin import CheckInError, forget_event_snapshot, get_event_snapshot, insert_check_in, validate_check_in
+from api.mail_queue import enqueue_mail, send_queued_mail
+from api.models import (
+    Attendance, Class, ClassEvent, ClassStudent, Event, Faculty, OutboundEmail, PendingStudent, School, Student,
+)
+from api.pagination import DefaultCursorPagination
+from api.reconcile import reconcile_pending_students
+from api.roster import sync_roster
+from api.serializers import StudentSerializer
+
+class FixtureMixin:
+    """A school with one faculty member, a class of registered and pending
+    students, and an event assigned to the class that is open for check-in."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.school = School.objects.create(name='Test U', faculty_domain='faculty.test.edu', student_domain='test.edu')
+        cls.faculty = Faculty.objects.create(
+            first_name='Fay', last_name='Culty', email='fay@faculty.test.edu', school=cls.school, email_verified=True,
+        )
+        cls.students = [
+            Student.objects.create(
+                first_name=f'Stu{i}', last_name='Dent', email=f'stu{i}@test.edu', student_id=f'S{i}', school=cls.school,
+            )
+            for i in range(5)
+        ]
+        cls.pending = [
+            PendingStudent.objects.create(
+                first_name=f'Pen{i}', last_name='Ding', email=f'pen{i}@test.edu', student_id=f'P{i}',
+                school=cls.school, added_by=cls.faculty,
+            )
+            for i in range(3)
+        ]
+        cls.event = Event.objects.create(name='Lecture', date=timezone.now(), faculty=cls.faculty, school=cls.school)
+        cls.class_instance = Class.objects.create(name='Intro', faculty=cls.faculty, school=cls.school, semester='Fall')
+        for student in cls.students:
+            ClassStudent.objects.create(class_instance=cls.class_instance, student=student)
+        for student in cls.pending:
+            ClassStudent.objects.create(class_instance=cls.class_instance, pending_student=student)
+        ClassEvent.objects.create(class_instance=cls.class_instance, event=cls.event)
+
+    def setUp(self):
+        self.client = APIClient()
+
+
+class CommittedFixtureMixin(FixtureMixin):
+    """FixtureMixin for TransactionTestCase, for code that reads from other threads' connections"""
+
+    def setUp(self):
+        self.setUpTestData()
+        super().setUp()
+
+
+# ---------------- Email Uniqueness ----------------
+class EmailUniquenessTests(FixtureMixin, TestCase):
+    def test_emails_are_unique_ignoring_case(self):
+        duplicates = (
+            lambda: Student.objects.create(
+                first_name='Stu', last_name='Dent', email='STU0@test.edu', student_id='S99', school=self.school,
+            ),
+            lambda: PendingStudent.objects.create(
+                first_name='Pen', last_name='Ding', email='Pen0@Test.edu', student_id='P99',
+                school=self.school, added_by=self.faculty,
+            ),
+            lambda: Faculty.objects.create(
+                first_name='Fay', last_name='Culty', email='FAY@faculty.test.edu', school=self.school,
+            ),
+        )
+        for create in duplicates:
+            with self.assertRaises(IntegrityError), transaction.atomic():
+                create()
+
+    def test_serializer_rejects_a_case_variant_through_the_index(self):
+        serializer = StudentSerializer(data={
+            'first_name': 'Stu', 'last_name': 'Dent', 'email': 'Stu0@Test.EDU', 'student_id': 'S99', 'school': self.school.id,
+        })
+        with CaptureQueriesContext(connection) as queries:
+            self.assertFalse(serializer.is_valid())
+        self.assertEqual(serializer.errors['email'][0].code, 'unique')
+        lookup = next(query['sql'] for query in queries.captured_queries if 'email' in query['sql'])
+        self.assertIn('LOWER(', lookup)
+        self.assertNotIn('UPPER(', lookup)
+
+    def test_serializer_allows_keeping_own_email(self):
+        serializer = StudentSerializer(self.students[0], data={'email': 'STU0@test.edu'}, partial=True)
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+
+    def test_registering_a_case_variant_is_a_400(self):
+        response = self.client.post('/api/student/register/', {
+            'first_name': 'Stu', 'last_name': 'Dent', 'email': 'STU0@test.edu', 'student_id': 'S99', 'school': self.school.id,
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('email', response.json())
+        self.assertEqual(Student.objects.filter(email__lower='stu0@test.edu').count(), 1)
+
+
+# ---------------- Pending Student Reconciliation ----------------
+class ReconcileTests(FixtureMixin, TestCase):
+    def test_pending_student_merges_into_registered_case_variant(self):
+        student = Student.objects.create(
+            first_name='Pen0', last_name='Ding', email='PEN0@Test.edu', student_id='R0', school=self.school,
+        )
+        totals = reconcile_pending_students()
+        self.assertEqual((totals['matched'], totals['memberships_moved']), (1, 1))
+        self.assertFalse(PendingStudent.objects.filter(pk=self.pending[0].pk).exists())
+        self.assertTrue(ClassStudent.objects.filter(class_instance=self.class_instance, student=student).exists())
+        self.assertEqual(PendingStudent.objects.count(), len(self.pending) - 1)
+
+
+# ---------------- Check-in ----------------
+class CheckInQueryTests(FixtureMixin, TestCase):
+    """Once the event snapshot is warm a scan costs one statement, new or duplicate"""
+
+    def setUp(self):
+        super().setUp()
+        forget_event_snapshot()
+        self.addCleanup(forget_event_snapshot)
+        get_event_snapshot(self.event.id)
+
+    def check_in(self, student):
+        scan = validate_check_in({'student': str(student.id), 'event': str(self.event.id), 'location': 'Room 1'})
+        return insert_check_in(scan['student'], scan['event'], scan['location'], scan['device_id'])
+
+    def test_scan_is_a_single_statement(self):
+        for student in self.students:
+            with self.assertNumQueries(1):
+                self.assertIsNotNone(self.check_in(student))
+        with self.assertNumQueries(1):
+            self.assertIsNone(self.check_in(self.students[0]))
+        self.assertEqual(Attendance.objects.count(), len(self.students))
+
+    def test_closed_window_is_refused_without_queries(self):
+        Event.objects.filter(pk=self.event.pk).update(date=timezone.now() - timedelta(days=1))
+        forget_event_snapshot()
+        get_event_snapshot(self.event.id)
+        with self.assertNumQueries(0):
+            with self.assertRaises(CheckInError) as raised:
+                validate_check_in({'student': str(self.students[0].id), 'event': str(self.event.id)})
+        self.assertIn('closed', raised.exception.errors['non_field_errors'][0])
+
+
+# ---------------- Pagination ----------------
+class ListPaginationTests(FixtureMixin, TestCase):
+    def test_whole_table_lists_are_always_paged(self):
+        for student in self.students:
+            Attendance.objects.create(student=student, event=self.event)
+        response = self.client.get('/api/attendance/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['results']), len(self.students))
+
+        response = self.client.get('/api/students/?page_size=2')
+        self.assertEqual(len(response.json()['results']), 2)
+        response = self.client.get(response.json()['next'])
+        self.assertEqual(len(response.json()['results']), 2)
+
+    def test_default_page_size_caps_a_bare_request(self):
+        with mock.patch.object(DefaultCursorPagination, 'page_size', 2):
+            response = self.client.get('/api/pending-students/')
+        self.assertEqual(len(response.json()['results']), 2)
+        self.assertIsNotNone(response.json()['next'])
+
+    def test_event_list_pages_upcoming_events(self):
+        # What EventsList.js and ClassDetails.js request (utils/events.js)
+        Event.objects.create(name='Old', date=timezone.now() - timedelta(days=30), faculty=self.faculty, school=self.school)
+        for day in range(1, 4):
+            Event.objects.create(name=f'Next {day}', date=timezone.now() + timedelta(days=day), faculty=self.faculty, school=self.school)
+        today = timezone.localdate().isoformat()
+        response = self.client.get(f'/api/events/?school={self.school.id}&page_size=2&date_from={today}')
+        page = response.json()
+        self.assertEqual([event['name'] for event in page['results']], ['Lecture', 'Next 1'])
+        page = self.client.get(page['next']).json()
+        self.assertEqual([event['name'] for event in page['results']], ['Next 2', 'Next 3'])
+        self.assertIsNone(page['next'])
+
+    def test_page_consumers_keep_plain_lists(self):
+        # The frontend reads these as arrays
+        response = self.client.get(f'/api/classes/?faculty={self.faculty.id}')
+        self.assertIsInstance(response.json(), list)
+
+
+# ---------------- Classes ----------------
+class ClassRosterQueryTests(FixtureMixin, TestCase):
+    """Roster IDs come from one prefetch, however many classes or students there are"""
+
+    def setUp(self):
+        super().setUp()
+        read_cache.clear()
+        for i in range(3):
+            class_instance = Class.objects.create(name=f'Extra {i}', faculty=self.faculty, school=self.school, semester='Fall')
+            for student in self.students:
+                ClassStudent.objects.create(class_instance=class_instance, student=student)
+
+    def test_list_does_not_query_per_class(self):
+        # Classes, then every roster
+        with self.assertNumQueries(2):
+            response = self.client.get(f'/api/classes/?faculty={self.faculty.id}')
+        self.assertEqual(response.status_code, 200)
+        rosters = {item['name']: item['students'] for item in response.json()}
+        self.assertEqual(len(rosters), 4)
+        self.assertEqual(len(rosters['Intro']), len(self.students) + len(self.pending))
+        self.assertIn(str(self.pending[0].id), rosters['Intro'])
+
+    def test_retrieve_does_not_query_per_student(self):
+        # ETag check, then the class and its roster
+        with self.assertNumQueries(3):
+            response = self.client.get(f'/api/classes/{self.class_instance.id}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['students']), len(self.students) + len(self.pending))
+
+    def test_roster_change_in_another_worker_changes_etag(self):
+        url = f'/api/classes/{self.class_instance.id}/'
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, headers={'If-None-Match': etag}).status_code, 304)
+
+        # Made elsewhere, so this process's read cache is never invalidated
+        with mock.patch('api.roster.forget'):
+            ClassStudent.objects.filter(class_instance=self.class_instance, student=self.students[0]).delete()
+        response = self.client.get(url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn(str(self.students[0].id), response.json()['students'])
+
+        # A pending student moved over to a registered one, as reconciliation does
+        etag = response['ETag']
+        ClassStudent.objects.filter(class_instance=self.class_instance, pending_student=self.pending[0]).update(
+            student=self.students[0], pending_student=None,
+        )
+        response = self.client.get(url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(str(self.students[0].id), response.json()['students'])
+
+
+class CreateClassTests(FixtureMixin, TestCase):
+    def test_malformed_rows_are_reported_not_fatal(self):
+        response = self.client.post('/api/class/create/', {
+            'faculty_id': str(self.faculty.id), 'name': 'Seminar', 'semester': 'Fall',
+            'students': [
+                {'email': 'stu0@test.edu'},
+                {'email': 'fresh@test.edu', 'first_name': 'Fresh', 'student_id': 'F1'},
+                {'email': 'not-an-email'},
+                {'email': 'long@test.edu', 'first_name': 'x' * 101},
+                {'email': 'num@test.edu', 'student_id': 42},
+                'stray',
+            ],
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['roster'], {'enrolled': 2, 'already_enrolled': 0, 'duplicate': 0, 'error': 4})
+        self.assertEqual([result['row'] for result in response.json()['rejected']], [3, 4, 5, 6])
+        new_class = Class.objects.get(name='Seminar')
+        self.assertEqual(ClassStudent.objects.filter(class_instance=new_class).count(), 2)
+
+    def test_csv_with_extra_fields_imports(self):
+        upload = SimpleUploadedFile('roster.csv', b'email,first_name\nlate@test.edu,Late,extra\n,,\n', content_type='text/csv')
+        response = self.client.post(
+            f'/api/classes/{self.class_instance.id}/roster/import/',
+            {'file': upload, 'faculty_id': str(self.faculty.id)}, format='multipart',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['summary']['enrolled'], 1)
+        self.assertEqual(len(response.json()['results']), 1)
+
+    def test_students_must_be_a_list(self):
+        response = self.client.post('/api/class/create/', {
+            'faculty_id': str(self.faculty.id), 'name': 'Seminar', 'semester': 'Fall', 'students': 'stu0@test.edu',
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Class.objects.filter(name='Seminar').exists())
+
+
+class RosterSyncTests(FixtureMixin, TestCase):
+    """update_class applies roster changes as a diff, so writes scale with the change"""
+
+    def roster_ids(self):
+        return [str(student.id) for student in self.students + self.pending]
+
+    def sync(self, items):
+        with CaptureQueriesContext(connection) as queries:
+            changes = sync_roster(self.class_instance, self.faculty, items)
+        table = ClassStudent._meta.db_table
+        writes = [
+            query['sql'] for query in queries.captured_queries
+            if query['sql'].startswith(('INSERT', 'UPDATE', 'DELETE')) and table in query['sql']
+        ]
+        return changes, len(writes)
+
+    def test_writes_scale_with_the_change(self):
+        changes, writes = self.sync(self.roster_ids())
+        self.assertEqual((changes['added'], changes['removed'], changes['unchanged'], writes), (0, 0, 8, 0))
+
+        newcomer = Student.objects.create(
+            first_name='New', last_name='Comer', email='new@test.edu', student_id='N1', school=self.school,
+        )
+        changes, writes = self.sync(self.roster_ids() + [str(newcomer.id)])
+        self.assertEqual((changes['added'], changes['removed'], changes['unchanged'], writes), (1, 0, 8, 1))
+
+        changes, writes = self.sync(self.roster_ids()[2:])
+        self.assertEqual((changes['added'], changes['removed'], changes['unchanged'], writes), (0, 3, 6, 1))
+
+    def test_entry_results_tell_new_from_existing(self):
+        changes, _ = self.sync([{'email': 'STU0@test.edu'}, {'email': 'late@test.edu', 'student_id': 'L1'}])
+        statuses = {result['email']: result['status'] for result in changes['results']}
+        self.assertEqual(statuses, {'STU0@test.edu': 'unchanged', 'late@test.edu': 'enrolled'})
+        self.assertEqual((changes['added'], changes['removed'], changes['unchanged']), (1, 7, 1))
+
+
+# ---------------- Class Event Attendance ----------------
+class ClassEventAttendanceTests(FixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        Attendance.objects.create(student=self.students[0], event=self.event)
+        self.url = f'/api/attendance/event/{self.event.id}/class/{self.class_instance.id}/?faculty_id={self.faculty.id}'
+
+    def test_whole_roster_in_three_queries(self):
+        # Class, event, then the roster joined to its attendance, however long the roster
+        with self.assertNumQueries(3):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        rows = {row['email']: row for row in response.json()}
+        self.assertEqual(len(rows), len(self.students) + len(self.pending))
+        self.assertTrue(rows['stu0@test.edu']['attended'])
+        self.assertFalse(rows['stu1@test.edu']['attended'])
+        self.assertFalse(rows['pen0@test.edu']['registered'])
+
+    def test_other_faculty_is_refused(self):
+        response = self.client.get(self.url.replace(str(self.faculty.id), str(self.event.id)))
+        self.assertEqual(response.status_code, 403)
+
+
+# ---------------- Attendance Export ----------------
+class AttendanceExportTests(FixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        for student in self.students:
+            Attendance.objects.create(student=student, event=self.event)
+        self.url = f'/api/attendance/event/{self.event.id}/export/?faculty_id={self.faculty.id}'
+
+    def test_wsgi_export_streams(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.is_async)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 1 + len(self.students))
+
+    async def test_asgi_export_is_not_buffered(self):
+        with warnings.catch_warnings():
+            # Django warns when it has to drain a sync iterator under ASGI
+            warnings.filterwarnings('error', message='StreamingHttpResponse must consume')
+            response = await AsyncClient().get(self.url)
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response.is_async)
+            content = b''.join([chunk async for chunk in response.streaming_content])
+        lines = content.decode().splitlines()
+        self.assertEqual(lines[0].split(',')[0], 'Student ID')
+        self.assertEqual(len(lines), 1 + len(self.students))
+
+
+class ClassRosterEndpointTests(FixtureMixin, TestCase):
+    """The class page loads its whole roster with one request and one query"""
+
+    def setUp(self):
+        super().setUp()
+        read_cache.clear()
+        self.addCleanup(read_cache.clear)
+        self.url = f'/api/class-students/roster/?class_instance={self.class_instance.id}'
+
+    def test_roster_in_one_request(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        emails = {student['email'] for student in response.json()}
+        self.assertEqual(emails, {student.email for student in self.students + self.pending})
+
+        # Served from the cache, and revalidated without a body
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, headers={'If-None-Match': response['ETag']})
+        self.assertEqual(response.status_code, 304)
+
+
+# ---------------- Indexes ----------------
+@skipUnless(connection.vendor == 'postgresql', 'EXPLAIN output is checked against the Postgres planner')
+class AttendanceIndexTests(FixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        for student in self.students:
+            Attendance.objects.create(student=student, event=self.event)
+
+    def explain(self, queryset):
+        with connection.cursor() as cursor:
+            cursor.execute(f'ANALYZE {Attendance._meta.db_table}')
+            # The fixture table is tiny, so only compare the indexes against each other
+            cursor.execute('SET LOCAL enable_seqscan = off')
+        return queryset.explain()
+
+    def test_student_history_uses_index(self):
+        queryset = Attendance.objects.filter(student=self.students[0]).order_by('-scanned_at', '-id')
+        self.assertIn('attendance_student_scan_idx', self.explain(queryset))
+
+    def test_event_report_uses_index(self):
+        queryset = Attendance.objects.filter(event=self.event).order_by('scanned_at', 'id')
+        self.assertIn('attendance_event_scan_idx', self.explain(queryset))
+
+
+# ---------------- Write-Behind Buffer ----------------
+class SpoolTests(FixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        spool_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(spool_dir.cleanup)
+        self.spool_dir = spool_dir.name
+
+    def write_orphan(self, name, students):
+        with open(os.path.join(self.spool_dir, name), 'w', encoding='utf-8') as spool:
+            for student in students:
+                spool.write(json.dumps({
+                    'student': str(student.id), 'event': str(self.event.id),
+                    'scanned_at': timezone.now().isoformat(),
+                }) + '\n')
+
+    def test_recycled_pid_does_not_hide_orphan(self):
+        # Left behind by an earlier process that had the pid we have now
+        self.write_orphan(f'attendance-{os.getpid()}.spool', self.students[:2])
+        self.write_orphan(f'attendance-{os.getpid()}-1-0badf00d.spool', self.students[2:3])
+
+        buffer = WriteBehindBuffer(self.spool_dir, 1000, 100)
+        self.addCleanup(buffer._spool.close)
+        self.assertEqual(len(os.listdir(self.spool_dir)), 3)
+
+        self.assertEqual(replay_orphaned_spools(self.spool_dir), 3)
+        self.assertEqual(Attendance.objects.count(), 3)
+        # Only the live buffer's own spool is left
+        self.assertEqual(os.listdir(self.spool_dir), [os.path.basename(buffer.spool_path)])
+
+    def test_failed_replay_is_retried(self):
+        name = f'attendance-{os.getpid()}-1-0badf00d.spool'
+        self.write_orphan(name, self.students[:2])
+
+        with mock.patch('api.attendance_buffer.write_scans', side_effect=DatabaseError('down')):
+            with self.assertRaises(DatabaseError):
+                replay_orphaned_spools(self.spool_dir)
+        # Handed back under its old name, so the next replay claims it again
+        self.assertEqual(os.listdir(self.spool_dir), [name])
+
+        self.assertEqual(replay_orphaned_spools(self.spool_dir), 2)
+        self.assertEqual(os.listdir(self.spool_dir), [])
+
+    def test_scan_for_unknown_student_is_logged(self):
+        self.write_orphan(f'attendance-{os.getpid()}-1-0badf00d.spool', self.students[:1])
+        student_id = str(self.students[0].id)
+        self.students[0].delete()
+
+        with self.assertLogs('api.attendance_buffer', 'WARNING') as logs:
+            self.assertEqual(replay_orphaned_spools(self.spool_dir), 0)
+        self.assertIn(student_id, logs.output[0])
+
+# ---------------- QR Sheets ----------------
+class FakePool:
+    """Stands in for the rendering pool; submit() raises or hands back a prepared future"""
+
+    def __init__(self, outcome):
+        self.outcome = outcome
+        self.submitted = 0
+
+    def submit(self, *args):
+        self.submitted += 1
+        if isinstance(self.outcome, Exception):
+            raise self.outcome
+        return self.outcome
+
+    def shutdown(self, wait=True):
+        pass
+
+
+class QRJobTests(TestCase):
+    def setUp(self):
+        job_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(job_dir.cleanup)
+        overrides = override_settings(QR_JOB_DIR=job_dir.name, QR_JOB_TIMEOUT=600)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def submit_with(self, pool):
+        with mock.patch.object(qr_jobs, '_get_executor', return_value=pool):
+            return qr_jobs.submit_qr_sheet([{'name': 'Lecture'}])
+
+    def test_broken_pool_on_submit_fails_the_job(self):
+        pool = FakePool(BrokenProcessPool('A child process terminated abruptly'))
+        job = qr_jobs.get_job(self.submit_with(pool))
+        self.assertEqual(pool.submitted, 2)
+        self.assertEqual(job['status'], 'failed')
+        self.assertIn('terminated abruptly', job['error'])
+
+    def test_pool_breaking_under_the_job_fails_it(self):
+        future = Future()
+        job_id = self.submit_with(FakePool(future))
+        self.assertEqual(qr_jobs.get_job(job_id)['status'], 'pending')
+        future.set_exception(BrokenProcessPool('A child process terminated abruptly'))
+        self.assertEqual(qr_jobs.get_job(job_id)['status'], 'failed')
+
+    def test_abandoned_job_times_out(self):
+        job_id = self.submit_with(FakePool(Future()))
+        self.assertEqual(qr_jobs.get_job(job_id)['status'], 'pending')
+        with mock.patch.object(qr_jobs.time, 'time', return_value=time.time() + 601):
+            self.assertEqual(qr_jobs.get_job(job_id)['status'], 'failed')
+        # The verdict is written back, so every worker reports the same
+        self.assertEqual(qr_jobs.get_job(job_id)['status'], 'failed')
+
+
+# ---------------- Mail Queue ----------------
+
+class UnreachableSMTPBackend(BaseEmailBackend):
+    """Stands in for an SMTP server that is down"""
+    opened_with = []
+
+    def open(self):
+        # Record what the queue looked like when the connection was attempted
+        type(self).opened_with.append(list(OutboundEmail.objects.values_list('status', 'attempts')))
+        raise SMTPConnectError(421, 'Service not available')
+
+    def send_messages(self, email_messages):
+        raise AssertionError('open() always fails')
+
+
+class PickySMTPBackend(BaseEmailBackend):
+    """Stands in for an SMTP server that refuses one address"""
+    def send_messages(self, email_messages):
+        for message in email_messages:
+            if 'bounce@test.edu' in message.to:
+                raise SMTPRecipientsRefused({'bounce@test.edu': (550, b'No such user')})
+            mail.outbox.append(message)
+        return len(email_messages)
+
+
+class MailQueueTests(TestCase):
+    def setUp(self):
+        mail.outbox = []
+        # The backend is loaded by dotted path, which may be a second copy of this module
+        self.unreachable = import_string('api.tests.UnreachableSMTPBackend')
+        self.unreachable.opened_with = []
+
+    def make_due(self):
+        OutboundEmail.objects.update(next_attempt_at=timezone.now())
+
+    def test_sends_queued_mail(self):
+        enqueue_mail('Hello', 'Body', ['stu@test.edu'], html_message='<p>Body</p>')
+        self.assertEqual(send_queued_mail(), (1, 0))
+        email = OutboundEmail.objects.get()
+        self.assertEqual((email.status, email.attempts), (OutboundEmail.STATUS_SENT, 1))
+        self.assertEqual(mail.outbox[0].to, ['stu@test.edu'])
+
+    @override_settings(EMAIL_BACKEND='api.tests.UnreachableSMTPBackend')
+    def test_outage_uses_up_attempts(self):
+        enqueue_mail('Hello', 'Body', ['stu@test.edu'])
+        delays = []
+        for attempt in range(1, 6):
+            self.make_due()
+            before = timezone.now()
+            self.assertEqual(send_queued_mail(max_attempts=5), (0, 1))
+            email = OutboundEmail.objects.get()
+            self.assertEqual(email.attempts, attempt)
+            self.assertIn('Service not available', email.last_error)
+            if attempt < 5:
+                self.assertEqual(email.status, OutboundEmail.STATUS_PENDING)
+                delays.append(round((email.next_attempt_at - before).total_seconds()))
+        self.assertEqual(email.status, OutboundEmail.STATUS_FAILED)
+        self.assertEqual(delays, [30, 60, 120, 240])
+
+        # A failed email is not picked up again
+        self.make_due()
+        OutboundEmail.objects.update(status=OutboundEmail.STATUS_FAILED)
+        self.assertEqual(send_queued_mail(), (0, 0))
+
+    @override_settings(EMAIL_BACKEND='api.tests.UnreachableSMTPBackend')
+    def test_claim_is_committed_before_connecting(self):
+        enqueue_mail('Hello', 'Body', ['stu@test.edu'])
+        send_queued_mail()
+        self.assertEqual(self.unreachable.opened_with, [[(OutboundEmail.STATUS_SENDING, 1)]])
+
+    @override_settings(EMAIL_BACKEND='api.tests.PickySMTPBackend')
+    def test_one_refused_recipient_does_not_fail_the_batch(self):
+        enqueue_mail('Hello', 'Body', ['stu@test.edu'])
+        enqueue_mail('Hello', 'Body', ['bounce@test.edu'])
+        self.assertEqual(send_queued_mail(), (1, 1))
+        statuses = dict(OutboundEmail.objects.values_list('recipients__0', 'status'))
+        self.assertEqual(statuses, {'stu@test.edu': OutboundEmail.STATUS_SENT, 'bounce@test.edu': OutboundEmail.STATUS_PENDING})
+
+    @override_settings(MAIL_QUEUE_CLAIM_TIMEOUT=600)
+    def test_stale_claim_is_picked_up_again(self):
+        enqueue_mail('Hello', 'Body', ['stu@test.edu'])
+        OutboundEmail.objects.update(status=OutboundEmail.STATUS_SENDING, attempts=1, claimed_at=timezone.now())
+        self.assertEqual(send_queued_mail(), (0, 0))
+
+        OutboundEmail.objects.update(claimed_at=timezone.now() - timedelta(seconds=601))
+        self.assertEqual(send_queued_mail(), (1, 0))
+        self.assertEqual(OutboundEmail.objects.get().attempts, 2)
+
+
+# ---------------- Async Views ----------------
+class AsyncViewTests(CommittedFixtureMixin, TransactionTestCase):
+    """The async views do their database work on pool threads, so the data has to be committed"""
+
+    def setUp(self):
+        super().setUp()
+        read_cache.clear()
+        self.async_client = AsyncClient()
+
+    async def test_check_in(self):
+        payload = {'student': str(self.students[0].id), 'event': str(self.event.id)}
+        response = await self.async_client.post('/api/attendance/check-in/', payload, content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        self.assertFalse(response.json()['duplicate'])
+        response = await self.async_client.post('/api/attendance/check-in/', payload, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['duplicate'])
+        self.assertEqual(await Attendance.objects.acount(), 1)
+
+    async def test_check_in_rejects_non_string_fields(self):
+        for field, value in (('location', {'room': 1}), ('device_id', 12345)):
+            payload = {'student': str(self.students[0].id), 'event': str(self.event.id), field: value}
+            response = await self.async_client.post('/api/attendance/check-in/', payload, content_type='application/json')
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.json(), {field: ['Not a valid string.']})
+        self.assertEqual(await Attendance.objects.acount(), 0)
+
+    async def test_check_in_unknown_student(self):
+        payload = {'student': str(self.event.id), 'event': str(self.event.id)}
+        response = await self.async_client.post('/api/attendance/check-in/', payload, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'student': ['Student not found.']})
+
+    async def test_event_detail_and_revalidation(self):
+        response = await self.async_client.get(f'/api/event/{self.event.id}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['name'], 'Lecture')
+        response = await self.async_client.get(f'/api/event/{self.event.id}/', headers={'If-None-Match': response['ETag']})
+        self.assertEqual(response.status_code, 304)
+
+    async def test_student_signin_queues_mail(self):
+        response = await self.async_client.post(
+            '/api/student/signin/', {'email': 'STU1@test.edu', 'student_id': 'S1'}, content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(await OutboundEmail.objects.filter(recipients=['stu1@test.edu']).acount(), 1)
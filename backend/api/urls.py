@@ -1,6 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from . import views
+from . import async_views, views
 from django.http import JsonResponse
 
 router = DefaultRouter()
@@ -36,20 +36,31 @@ def db_connection_test(request):
         }, status=500)
 
 urlpatterns = [
+    # Async views; ahead of the router, whose attendance/<pk>/ would otherwise catch check-in/
+    path('attendance/check-in/', async_views.check_in, name='attendance-check-in'),
+    path('event/<uuid:event_id>/', async_views.event_detail, name='event-detail-async'),
     path('', include(router.urls)),  # API Endpoints for all models
     path('student/register/', views.register_student, name='student-register'),
     path('faculty/register/', views.register_faculty, name='faculty-register'),
     path('verify-email/', views.verify_email, name='verify-email'),
-    path('student/signin/', views.student_signin, name='student-signin'),
-    path('student/direct-signin/', views.student_direct_signin, name='student-direct-signin'),
-    path('faculty/signin/', views.faculty_signin, name='faculty-signin'),
+    path('student/signin/', async_views.student_signin, name='student-signin'),
+    path('student/direct-signin/', async_views.student_direct_signin, name='student-direct-signin'),
+    path('faculty/signin/', async_views.faculty_signin, name='faculty-signin'),
     path('class/create/', views.create_class, name='create-class'),
     path('student/lookup/', views.lookup_student, name='lookup-student'),
     path('class/<int:pk>/update/', views.update_class, name='update-class'),
-    path('event/<str:event_id>/qr/', views.generate_event_qr, name='generate-event-qr'),
+    path('event/<uuid:event_id>/qr/', async_views.generate_event_qr, name='generate-event-qr'),
+    path('event/qr/batch/', views.generate_event_qr_batch, name='generate-event-qr-batch'),
+    path('event/qr/batch/<str:job_id>/', views.qr_batch_status, name='qr-batch-status'),
+    path('event/qr/batch/<str:job_id>/download/', views.qr_batch_download, name='qr-batch-download'),
     path('faculty/<uuid:pk>/update-profile/', views.update_faculty_profile, name='update-faculty-profile'),
     path('db-test/', db_connection_test, name='db-test'),
+    path('cache/stats/', views.read_cache_stats, name='read-cache-stats'),
     path('attendance/event/<uuid:event_id>/class/<int:class_id>/', views.get_class_event_attendance, name='class-event-attendance'),
+    path('attendance/event/<uuid:event_id>/export/', views.export_event_attendance, name='export-event-attendance'),
+    path('attendance/class/<int:class_id>/export/', views.export_class_attendance, name='export-class-attendance'),
+    path('attendance/school/<int:school_id>/export/', views.export_school_attendance, name='export-school-attendance'),
+    path('attendance/event/<uuid:event_id>/live/', async_views.live_event_attendance, name='live-event-attendance'),
     path('students/<uuid:pk>/update/', views.update_student_profile, name='update-student-profile'),
     path('students/<uuid:pk>/delete/', views.delete_student_account, name='delete-student-account'),
     path('students/<uuid:student_id>/attendance/', views.get_student_attendance, name='student-attendance'),
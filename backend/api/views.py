@@ -1,37 +1,75 @@
 from rest_framework import viewsets, status
 from rest_framework.response import Response
-from rest_framework.decorators import api_view
+from rest_framework.decorators import api_view, action
 from .models import School, Student, Faculty, Event, Class, Attendance, ClassStudent, ClassEvent, PendingStudent
-from .serializers import SchoolSerializer, StudentRegistrationSerializer, FacultySerializer, EventSerializer, ClassSerializer, AttendanceSerializer, FacultyRegistrationSerializer, ClassEventSerializer, StudentSerializer, PendingStudentSerializer, ClassStudentSerializer
+from .serializers import SchoolSerializer, StudentRegistrationSerializer, FacultySerializer, EventSerializer, ClassSerializer, AttendanceSerializer, FacultyRegistrationSerializer, ClassEventSerializer, StudentSerializer, PendingStudentSerializer, ClassStudentSerializer, sparse_fields
 from django.conf import settings
 import jwt
 from datetime import datetime, timedelta
 import traceback
-from django.core.mail import send_mail
-from rest_framework.exceptions import PermissionDenied
-import qrcode
-import io
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import letter
-from reportlab.lib.units import inch
-from django.http import HttpResponse
+from rest_framework.exceptions import PermissionDenied, ValidationError
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import FileResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
 from uuid import UUID
-from PIL import Image
+import csv
+import hashlib
+import json
+from django.utils.cache import quote_etag
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from .pagination import DefaultCursorPagination, EventCursorPagination, StudentAttendancePagination
+from django.utils.http import parse_etags
+from django.db import IntegrityError, transaction
+from django.db.models import Case, Count, F, FilteredRelation, Max, Prefetch, Q, When
+from .qr import event_qr_fields
+from .qr_jobs import get_job, submit_qr_sheet, pdf_path as qr_job_pdf_path
+from .mail_queue import enqueue_mail
+from .lookups import find_student_by_email, get_by_email, normalize_email
+from .roster import forget_rosters, import_roster, parse_roster_csv, summarize, sync_roster
+from .read_cache import cached, stats as cache_stats
+from .conditional import add_validators, not_modified, validators
 
 # ---------------- School ViewSet ----------------
 class SchoolViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = School.objects.all()
     serializer_class = SchoolSerializer
 
+    def list(self, request, *args, **kwargs):
+        # Every registration page loads the full list; anything fancier skips the cache
+        if request.query_params:
+            return super().list(request, *args, **kwargs)
+
+        def load():
+            schools = list(self.get_queryset())
+            return list(SchoolSerializer(schools, many=True).data), max((school.updated_at for school in schools), default=None)
+
+        data, updated_at = cached('schools', 'all', load)
+        if updated_at is None:
+            return Response(data)
+        # The count catches deletes, which leave the newest stamp alone
+        etag, last_modified = validators('schools', len(data), updated_at)
+        return not_modified(request, etag, last_modified) or add_validators(Response(data), etag, last_modified)
+
+    def retrieve(self, request, *args, **kwargs):
+        try:
+            school_id = int(kwargs['pk'])
+        except ValueError:
+            return super().retrieve(request, *args, **kwargs)
+        return _cached_detail(request, 'school', school_id, lambda: _versioned(SchoolSerializer, get_object_or_404(School, pk=school_id)))
+
 # ---------------- Student ViewSet ----------------
 class StudentViewSet(viewsets.ModelViewSet):
     queryset = Student.objects.all()
     serializer_class = StudentSerializer
+    pagination_class = DefaultCursorPagination
 
 # ---------------- Pending Student ViewSet ----------------
 class PendingStudentViewSet(viewsets.ModelViewSet):
     queryset = PendingStudent.objects.all()
     serializer_class = PendingStudentSerializer
+    pagination_class = DefaultCursorPagination
     
     def get_queryset(self):
         queryset = PendingStudent.objects.all()
@@ -52,17 +90,40 @@ class ClassStudentViewSet(viewsets.ModelViewSet):
     serializer_class = ClassStudentSerializer
 
     def get_queryset(self):
-        queryset = ClassStudent.objects.all()
+        # student_info reads both sides of the association, so join them up front
+        queryset = ClassStudent.objects.select_related('student', 'pending_student')
         class_instance = self.request.query_params.get('class_instance', None)
         
         if class_instance is not None:
             queryset = queryset.filter(class_instance=class_instance)
             
-        # For debugging - check what we're returning
-        print(f"ClassStudentViewSet query for class_instance {class_instance}: Found {queryset.count()} records")
-            
         return queryset
 
+    @action(detail=False, methods=['get'])
+    def roster(self, request):
+        """Registered and pending students of a class in a single response"""
+        class_instance = request.query_params.get('class_instance')
+        if not class_instance:
+            return Response({'error': 'class_instance parameter is required'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            class_id = int(class_instance)
+        except ValueError:
+            return Response({'error': 'class_instance must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+
+        def load():
+            class_students = self.get_queryset().order_by('id')
+            serializer = ClassStudentSerializer(class_students, many=True)
+            roster = [entry['student_info'] for entry in serializer.data if entry['student_info']]
+            # Pages re-request the roster on every visit; unchanged rosters get a 304
+            etag = quote_etag(hashlib.md5(json.dumps(roster, sort_keys=True).encode()).hexdigest())
+            return roster, etag
+
+        roster, etag = cached('roster', class_id, load)
+        if etag in parse_etags(request.headers.get('If-None-Match', '')):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+        return Response(roster, headers={'ETag': etag})
+
 # ---------------- Register Student ----------------
 @api_view(['POST'])
 def register_student(request):
@@ -73,40 +134,39 @@ def register_student(request):
         student_id = request.data.get('student_id')
         
         try:
-            # Check if a pending student with this email exists
-            pending_student = PendingStudent.objects.filter(email=email).first()
-            
-            if not pending_student:
-                # Also try finding by student ID as a fallback
-                pending_student = PendingStudent.objects.filter(student_id=student_id).first()
+            # Look for a pending student in one query, preferring an email match
+            # over the student ID fallback
+            match = Q(email__lower=normalize_email(email))
+            if student_id:
+                match |= Q(student_id=student_id)
+            pending_student = (
+                PendingStudent.objects.filter(match)
+                .order_by(Case(When(email__lower=normalize_email(email), then=0), default=1))
+                .first()
+            )
             
-            if pending_student:
-                print(f"Found existing pending student with email: {email}")
-                
-                # Create registered student using pending student data, but with the data from registration form
+            with transaction.atomic():
+                # Create registered student using the data from the registration form
                 student = serializer.save(email_verified=False)
                 
-                # Update any ClassStudent records to point to the actual student
-                class_associations = ClassStudent.objects.filter(pending_student=pending_student)
-                association_count = 0
-                
-                for association in class_associations:
-                    association.student = student
-                    association.pending_student = None
-                    association.save()
-                    association_count += 1
-                
-                print(f"Updated {association_count} class associations for student {email}")
-                
-                # Delete the pending student record
-                pending_student_id = pending_student.id
-                pending_student.delete()
-                print(f"Deleted pending student with id {pending_student_id}")
-                
-            else:
-                # No pending student found, just create a new student
-                print(f"No pending student found for {email}, creating new student")
-                student = serializer.save(email_verified=False)
+                if pending_student:
+                    print(f"Found existing pending student with email: {email}")
+                    
+                    # The UPDATE below sends no signals, so drop the affected rosters here
+                    forget_rosters(pending_students=[pending_student.id])
+                    # Point every class association at the new student in one UPDATE
+                    association_count = ClassStudent.objects.filter(pending_student=pending_student).update(
+                        student=student,
+                        pending_student=None
+                    )
+                    print(f"Updated {association_count} class associations for student {email}")
+                    
+                    # Delete the pending student record
+                    pending_student_id = pending_student.id
+                    pending_student.delete()
+                    print(f"Deleted pending student with id {pending_student_id}")
+                else:
+                    print(f"No pending student found for {email}, created new student")
         
             # Generate verification token
             token = jwt.encode({
@@ -127,16 +187,15 @@ def register_student(request):
             """
 
             try:
-                send_mail(
+                enqueue_mail(
                     subject="Verify your ClassAttend account",
                     message=f"Please click the following link to verify your email: {verification_url}",
                     from_email=settings.DEFAULT_FROM_EMAIL,
                     recipient_list=[email],
                     html_message=html_message,
-                    fail_silently=False,
                 )
             except Exception as e:
-                print(f"Error sending verification email: {str(e)}")
+                print(f"Error queueing verification email: {str(e)}")
                 # Continue with registration even if email fails
             
             # Return the success response with the student ID
@@ -200,97 +259,11 @@ def verify_email(request):
     except Exception as e:
         return Response({'error': f'Verification error: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-# ---------------- Student Sign In ----------------
-@api_view(['POST'])
-def student_signin(request):
-    email = request.data.get('email')
-    student_id = request.data.get('student_id')
-    remember_me = request.data.get('remember_me', False)
-
-    try:
-        student = Student.objects.get(email=email)
-
-        if student.student_id != student_id:
-            return Response({'error': 'Invalid student ID'}, status=status.HTTP_400_BAD_REQUEST)
-
-        # Token expiration: 30 days if "Remember Me" is selected, otherwise 24 hours
-        token_expiration = timedelta(days=30) if remember_me else timedelta(hours=24)
-        token = jwt.encode({
-            'student_id': str(student.id),
-            'exp': datetime.utcnow() + token_expiration
-        }, settings.SECRET_KEY, algorithm='HS256')
-
-        verification_url = f"{settings.FRONTEND_URL}/verify-email?token={token}"
-        html_message = f"""
-        <h3>Sign In to ClassAttend</h3>
-        <p>Click the button below to sign in to your account:</p>
-        <p><a href="{verification_url}" style="background-color: #DEA514; color: white; padding: 10px 20px; text-decoration: none; border-radius: 5px;">Sign In</a></p>
-        <p>If the button doesn't work, you can copy and paste this link into your browser:</p>
-        <p>{verification_url}</p>
-        """
-
-        send_mail(
-            subject="Sign in to ClassAttend",
-            message=f"Click the following link to sign in: {verification_url}",
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=[student.email],
-            html_message=html_message,
-            fail_silently=False,
-        )
-
-        return Response({'message': 'Please check your email for the sign-in link.'})
-
-    except Student.DoesNotExist:
-        return Response({'error': 'No account found with this email'}, status=status.HTTP_404_NOT_FOUND)
-    except Exception as e:
-        traceback.print_exc()
-        return Response({'error': 'An error occurred during sign in'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-
-# ---------------- Student Direct Sign In ----------------
-@api_view(['POST'])
-def student_direct_signin(request):
-    email = request.data.get('email')
-    student_id = request.data.get('student_id')
-    remember_me = request.data.get('remember_me', False)
-
-    if not email or not student_id:
-        return Response({'error': 'Email and Student ID are required'}, status=status.HTTP_400_BAD_REQUEST)
-
-    try:
-        student = Student.objects.get(email=email)
-
-        # Verify the student ID matches
-        if student.student_id != student_id:
-            return Response({'error': 'Invalid credentials'}, status=status.HTTP_401_UNAUTHORIZED)
-
-        # Token expiration: 30 days if "Remember Me" is selected, otherwise 24 hours
-        token_expiration = timedelta(days=30) if remember_me else timedelta(hours=24)
-
-        # Generate token
-        token = jwt.encode({
-            'student_id': str(student.id),
-            'exp': datetime.utcnow() + token_expiration
-        }, settings.SECRET_KEY, algorithm='HS256')
-
-        # Return token and student info directly
-        return Response({
-            'message': 'Sign-in successful',
-            'token': token,
-            'student_id': str(student.id),
-            'first_name': student.first_name,
-            'last_name': student.last_name
-        })
-
-    except Student.DoesNotExist:
-        return Response({'error': 'Invalid credentials'}, status=status.HTTP_401_UNAUTHORIZED)
-    except Exception as e:
-        traceback.print_exc()
-        return Response({'error': 'An error occurred during sign in'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-
 # ---------------- Faculty ViewSet ----------------
 class FacultyViewSet(viewsets.ModelViewSet):
     queryset = Faculty.objects.all()
     serializer_class = FacultySerializer
+    pagination_class = DefaultCursorPagination
 
     def perform_destroy(self, instance):
         # When deleting a faculty, we also want to delete all related data
@@ -321,10 +294,80 @@ class FacultyViewSet(viewsets.ModelViewSet):
         # Finally, delete the faculty account
         instance.delete()
 
+def _versioned(serializer_class, instance):
+    return dict(serializer_class(instance).data), instance.updated_at
+
+
+def _cached_detail(request, kind, key, load):
+    """Serve a cached (data, updated_at) pair with ETag/Last-Modified, or a 304"""
+    data, updated_at = cached(kind, key, load)
+    fields = request.query_params.get('fields') or ''
+    etag, last_modified = validators(kind, key, updated_at, fields)
+    response = not_modified(request, etag, last_modified)
+    if response is None:
+        response = add_validators(Response(sparse_fields(data, fields)), etag, last_modified)
+    return response
+
+
+def _parse_date_param(value, name, end_of_day=False):
+    """Parse a date or datetime query parameter into an aware datetime"""
+    parsed = parse_datetime(value)
+    if parsed is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValidationError({name: 'Must be a date (YYYY-MM-DD) or an ISO 8601 datetime'})
+        parsed = datetime.combine(day, datetime.max.time() if end_of_day else datetime.min.time())
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
 # ---------------- Event ViewSet ----------------
 class EventViewSet(viewsets.ModelViewSet):
     queryset = Event.objects.all()
     serializer_class = EventSerializer
+    pagination_class = EventCursorPagination
+
+    def get_queryset(self):
+        queryset = Event.objects.all()
+        params = self.request.query_params
+
+        school_id = params.get('school', None)
+        faculty_id = params.get('faculty', None)
+        class_id = params.get('class', None)
+
+        if school_id:
+            queryset = queryset.filter(school=school_id)
+        if faculty_id:
+            queryset = queryset.filter(faculty=faculty_id)
+        if class_id:
+            queryset = queryset.filter(classevent__class_instance=class_id)
+
+        # Date range: ?date_from=2025-01-01&date_to=2025-05-31 (dates or datetimes)
+        date_from = params.get('date_from', None)
+        date_to = params.get('date_to', None)
+        if date_from:
+            queryset = queryset.filter(date__gte=_parse_date_param(date_from, 'date_from'))
+        if date_to:
+            queryset = queryset.filter(date__lte=_parse_date_param(date_to, 'date_to', end_of_day=True))
+
+        # Batch lookup: /api/events/?ids=a,b,c
+        ids = self.request.query_params.get('ids', None)
+        if ids is not None:
+            try:
+                event_ids = [UUID(event_id) for event_id in ids.split(',') if event_id.strip()]
+            except ValueError:
+                raise ValidationError({'ids': 'Must be a comma-separated list of event IDs'})
+            queryset = queryset.filter(id__in=event_ids)
+
+        return queryset.order_by('date', 'id')
+
+    def retrieve(self, request, *args, **kwargs):
+        # Every student loads the event right before scanning, so serve it from the read cache
+        try:
+            event_id = UUID(str(kwargs['pk']))
+        except ValueError:
+            return super().retrieve(request, *args, **kwargs)
+        return _cached_detail(request, 'event', event_id, lambda: _versioned(EventSerializer, get_object_or_404(Event, pk=event_id)))
 
     def perform_update(self, serializer):
         # Ensure only the creator can update
@@ -357,7 +400,10 @@ class ClassViewSet(viewsets.ModelViewSet):
     serializer_class = ClassSerializer
     
     def get_queryset(self):
-        queryset = Class.objects.all()
+        # Roster IDs for every class come from one prefetch query
+        queryset = Class.objects.prefetch_related(
+            Prefetch('students', queryset=ClassStudent.objects.only('id', 'class_instance_id', 'student_id', 'pending_student_id'))
+        )
         
         faculty_id = self.request.query_params.get('faculty', None)
         
@@ -366,6 +412,31 @@ class ClassViewSet(viewsets.ModelViewSet):
             
         return queryset
 
+    def retrieve(self, request, *args, **kwargs):
+        # The class page polls this; a current If-None-Match is answered before
+        # the roster is prefetched or anything is serialized
+        try:
+            class_id = int(kwargs['pk'])
+        except ValueError:
+            return super().retrieve(request, *args, **kwargs)
+        # Roster changes don't touch the class row, so the version also covers
+        # the memberships: adding or removing one changes the count or the
+        # highest id, and moving a pending student over changes the registered
+        # count. It comes from the database, so every worker agrees on it. No
+        # Last-Modified for the same reason.
+        version = (
+            self.get_queryset().filter(pk=class_id)
+            .annotate(members=Count('students'), registered=Count('students__student'), last_member=Max('students__id'))
+            .values_list('updated_at', 'members', 'registered', 'last_member')
+            .first()
+        )
+        if version is None:
+            return super().retrieve(request, *args, **kwargs)
+
+        updated_at, members, registered, last_member = version
+        fields = request.query_params.get('fields') or ''
+        etag, _ = validators('class', class_id, updated_at, f"{members}:{registered}:{last_member}:{fields}")
+        return not_modified(request, etag) or add_validators(super().retrieve(request, *args, **kwargs), etag)
     
     def perform_create(self, serializer):
         serializer.save()
@@ -393,10 +464,113 @@ class ClassViewSet(viewsets.ModelViewSet):
         
         instance.delete()
 
+    @action(detail=True, methods=['get'], url_path='attendance-matrix')
+    def attendance_matrix(self, request, pk=None):
+        """Student x event attendance for a whole class.
+
+        Events are ordered by date. Each student's `attended` value is a hex
+        bitset where bit i (least significant first) is set if they attended
+        events[i]. The roster and the attended (student, event) pairs each come
+        from one query, so the cost doesn't grow with the number of sessions.
+        """
+        class_instance = get_object_or_404(Class.objects.only('id', 'faculty_id'), pk=pk)
+        faculty_id = request.query_params.get('faculty_id')
+        if not faculty_id:
+            return Response({"error": "Faculty authentication required"}, status=401)
+        if str(class_instance.faculty_id) != str(faculty_id):
+            return Response({"error": "You do not have permission to access this data"}, status=403)
+
+        events = list(
+            ClassEvent.objects.filter(class_instance=class_instance)
+            .order_by('event__date', 'event_id')
+            .values_list('event_id', 'event__name', 'event__date')
+        )
+        event_index = {event_id: index for index, (event_id, _, _) in enumerate(events)}
+
+        roster = ClassStudent.objects.filter(class_instance=class_instance).order_by('id').values(
+            'student_id', 'student__first_name', 'student__last_name', 'student__email', 'student__student_id',
+            'pending_student_id', 'pending_student__first_name', 'pending_student__last_name',
+            'pending_student__email', 'pending_student__student_id',
+        )
+
+        bits = {}
+        event_totals = [0] * len(events)
+        attended_pairs = Attendance.objects.filter(
+            event__classevent__class_instance=class_instance,
+            student__classstudent__class_instance=class_instance,
+        ).values_list('student_id', 'event_id')
+        for student_id, event_id in attended_pairs:
+            index = event_index[event_id]
+            bits[student_id] = bits.get(student_id, 0) | (1 << index)
+            event_totals[index] += 1
+
+        students = []
+        for row in roster:
+            prefix = 'student' if row['student_id'] else 'pending_student'
+            attended = bits.get(row['student_id'], 0)
+            total = bin(attended).count('1')
+            students.append({
+                'id': str(row[f'{prefix}_id']),
+                'first_name': row[f'{prefix}__first_name'],
+                'last_name': row[f'{prefix}__last_name'],
+                'email': row[f'{prefix}__email'],
+                'student_id': row[f'{prefix}__student_id'],
+                'registered': bool(row['student_id']),
+                'attended': format(attended, 'x'),
+                'total': total,
+                'percentage': round(100 * total / len(events), 1) if events else 0.0,
+            })
+
+        return Response({
+            'events': [
+                {'id': str(event_id), 'name': name, 'date': date, 'attended': event_totals[index]}
+                for index, (event_id, name, date) in enumerate(events)
+            ],
+            'students': students,
+        })
+
+    @action(detail=True, methods=['post'], url_path='roster/import')
+    def import_roster(self, request, pk=None):
+        """Add a whole roster to a class from a CSV upload or a JSON list of students.
+
+        Send either a `file` (CSV with a header row) or `students`, a list of
+        objects with email, first_name, last_name and student_id. Returns the
+        outcome of every row along with a count per status.
+        """
+        class_instance = get_object_or_404(Class.objects.only('id', 'faculty_id'), pk=pk)
+        faculty_id = request.data.get('faculty_id') or request.query_params.get('faculty_id')
+        if not faculty_id:
+            return Response({"error": "Faculty authentication required"}, status=401)
+        if str(class_instance.faculty_id) != str(faculty_id):
+            return Response({"error": "You do not have permission to modify this class"}, status=403)
+
+        upload = request.FILES.get('file')
+        if upload is not None:
+            try:
+                entries = parse_roster_csv(upload.read().decode('utf-8'))
+            except UnicodeDecodeError:
+                return Response({"error": "Roster file must be UTF-8 encoded CSV"}, status=400)
+        else:
+            entries = request.data.get('students')
+            if not isinstance(entries, list):
+                return Response({"error": "Provide a CSV file or a list of students"}, status=400)
+
+        try:
+            faculty = Faculty.objects.only('id', 'school_id').get(id=faculty_id)
+            results = import_roster(class_instance, faculty, entries)
+        except IntegrityError as e:
+            return Response({"error": f"Roster conflicts with existing students: {str(e)}"}, status=400)
+        except Exception as e:
+            traceback.print_exc()
+            return Response({"error": str(e)}, status=500)
+
+        return Response({'summary': summarize(results), 'results': results})
+
 # ---------------- Attendance ViewSet ----------------
 class AttendanceViewSet(viewsets.ModelViewSet):
     queryset = Attendance.objects.all()
     serializer_class = AttendanceSerializer
+    pagination_class = DefaultCursorPagination
 
 # ---------------- Register Faculty ----------------
 @api_view(['POST'])
@@ -420,13 +594,12 @@ def register_faculty(request):
             <p>{verification_url}</p>
             """
 
-            send_mail(
+            enqueue_mail(
                 subject="Verify your ClassAttend Faculty Account",
                 message=f"Welcome to ClassAttend! Click the following link to verify your email: {verification_url}",
                 from_email=settings.DEFAULT_FROM_EMAIL,
                 recipient_list=[faculty.email],
                 html_message=html_message,
-                fail_silently=False,
             )
 
             return Response({
@@ -440,62 +613,6 @@ def register_faculty(request):
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-# ---------------- Faculty SignIn ----------------
-@api_view(['POST'])
-def faculty_signin(request):
-    email = request.data.get('email')
-    remember_me = request.data.get('remember_me', False)
-
-    try:
-        faculty = Faculty.objects.get(email=email)
-
-        if not faculty.email_verified:
-            return Response({
-                'error': 'Please verify your email address first'
-            }, status=status.HTTP_400_BAD_REQUEST)
-
-        # Token expiration: 30 days if "Remember Me" is selected, otherwise 24 hours
-        token_expiration = timedelta(days=30) if remember_me else timedelta(days=1)
-
-        # Generate authentication token
-        token = jwt.encode({
-            'faculty_id': str(faculty.id),
-            'exp': datetime.utcnow() + token_expiration
-        }, settings.SECRET_KEY, algorithm='HS256')
-
-        # Send signin link via email
-        signin_url = f"{settings.FRONTEND_URL}/verify-email?token={token}&type=faculty"
-        html_message = f"""
-        <h3>Faculty Sign In</h3>
-        <p>Click the button below to sign in to your ClassAttend account:</p>
-        <p><a href="{signin_url}" style="background-color: #DEA514; color: white; padding: 10px 20px; text-decoration: none; border-radius: 5px;">Sign In</a></p>
-        <p>If the button doesn't work, you can copy and paste this link into your browser:</p>
-        <p>{signin_url}</p>
-        """
-
-        send_mail(
-            subject="ClassAttend Faculty Sign In Link",
-            message=f"Click the following link to sign in: {signin_url}",
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=[faculty.email],
-            html_message=html_message,
-            fail_silently=False,
-        )
-
-        return Response({
-            'message': 'Please check your email for the sign-in link.'
-        })
-
-    except Faculty.DoesNotExist:
-        return Response({
-            'error': 'No faculty account found with this email address'
-        }, status=status.HTTP_404_NOT_FOUND)
-    except Exception as e:
-        traceback.print_exc()
-        return Response({
-            'error': f'Sign in error: {str(e)}'
-        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-
 # ---------------- Create Class ----------------
 @api_view(['POST'])
 def create_class(request):
@@ -515,66 +632,23 @@ def create_class(request):
         
         serializer = ClassSerializer(data=class_data)
         if serializer.is_valid():
-            new_class = serializer.save()
-            
-            # If students are provided, add them to the class
-            student_info_list = request.data.get('students', [])
-            for student_info in student_info_list:
-                try:
-                    # Try to find the student by email first
-                    email = student_info.get('email')
-                    if not email:
-                        continue
-                        
-                    student = None
-                    pending_student = None
-                    
-                    # Check if student exists already
-                    try:
-                        student = Student.objects.get(email=email)
-                        # If student exists, create the association
-                        ClassStudent.objects.create(
-                            class_instance=new_class,
-                            student=student
-                        )
-                        print(f"Added registered student {email} to class")
-                    except Student.DoesNotExist:
-                        # Student doesn't exist in registered students
-                        # Check if email exists in pending students
-                        try:
-                            pending_student = PendingStudent.objects.get(email=email)
-                            # Update pending student info if needed
-                            pending_student.first_name = student_info.get('firstName', student_info.get('first_name', pending_student.first_name))
-                            pending_student.last_name = student_info.get('lastName', student_info.get('last_name', pending_student.last_name))
-                            pending_student.student_id = student_info.get('studentId', student_info.get('student_id', pending_student.student_id))
-                            pending_student.save()
-                        except PendingStudent.DoesNotExist:
-                            # Create new pending student
-                            pending_student = PendingStudent.objects.create(
-                                first_name=student_info.get('firstName', student_info.get('first_name', '')),
-                                last_name=student_info.get('lastName', student_info.get('last_name', '')),
-                                student_id=student_info.get('studentId', student_info.get('student_id', '')),
-                                email=email,
-                                school=faculty.school,
-                                added_by=faculty
-                            )
-                        
-                        # IMPORTANT: Create association with pending student
-                        if pending_student:
-                            # Explicitly create the ClassStudent entry for the pending student
-                            ClassStudent.objects.create(
-                                class_instance=new_class,
-                                pending_student=pending_student
-                            )
-                            print(f"Added pending student {email} to ClassStudent table")
-                        
-                except Exception as e:
-                    print(f"Error processing student {email if 'email' in locals() else 'unknown'}: {str(e)}")
-                    continue
+            # If students are provided, add them to the class in one batch
+            student_info_list = request.data.get('students') or []
+            if not isinstance(student_info_list, list):
+                return Response({'error': 'students must be a list'}, status=status.HTTP_400_BAD_REQUEST)
+            results = []
+            with transaction.atomic():
+                new_class = serializer.save()
+                if student_info_list:
+                    # Malformed rows come back as errors and are skipped; the rest are added
+                    results = import_roster(new_class, faculty, student_info_list)
+                    print(f"Added students to class {new_class.id}: {summarize(results)}")
             
             return Response({
                 'message': 'Class created successfully',
-                'class': ClassSerializer(new_class).data
+                'class': ClassSerializer(new_class).data,
+                'roster': summarize(results),
+                'rejected': [result for result in results if result['status'] == 'error']
             }, status=status.HTTP_201_CREATED)
         else:
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -583,6 +657,10 @@ def create_class(request):
         return Response({
             'error': 'Faculty not found'
         }, status=status.HTTP_404_NOT_FOUND)
+    except IntegrityError as e:
+        return Response({
+            'error': f'Roster conflicts with existing students: {str(e)}'
+        }, status=status.HTTP_400_BAD_REQUEST)
     except Exception as e:
         traceback.print_exc()
         return Response({
@@ -597,31 +675,12 @@ def lookup_student(request):
     if not email:
         return Response({'error': 'Email parameter is required'}, status=status.HTTP_400_BAD_REQUEST)
     
-    try:
-        # First try to find a registered student
-        student = Student.objects.get(email=email)
-        return Response({
-            'id': str(student.id),
-            'email': student.email,
-            'first_name': student.first_name,
-            'last_name': student.last_name,
-            'student_id': student.student_id,
-            'status': 'registered'
-        })
-    except Student.DoesNotExist:
-        # Then check for a pending student
-        try:
-            pending = PendingStudent.objects.get(email=email)
-            return Response({
-                'id': str(pending.id),
-                'email': pending.email,
-                'first_name': pending.first_name,
-                'last_name': pending.last_name,
-                'student_id': pending.student_id,
-                'status': 'pending'
-            })
-        except PendingStudent.DoesNotExist:
-            return Response({'error': 'Student not found'}, status=status.HTTP_404_NOT_FOUND)
+    # Registered and pending students are searched together, registered first
+    student = find_student_by_email(email)
+    if student is None:
+        return Response({'error': 'Student not found'}, status=status.HTTP_404_NOT_FOUND)
+    student['id'] = str(student['id'])
+    return Response(student)
 
 # ---------------- Faculty Add Student ----------------
 @api_view(['POST'])
@@ -644,7 +703,7 @@ def faculty_add_student(request):
         
         # Check if student already exists as registered user
         try:
-            student = Student.objects.get(email=email)
+            student = get_by_email(Student.objects.all(), email)
             # If class_id provided, associate with class
             if class_id:
                 try:
@@ -671,7 +730,7 @@ def faculty_add_student(request):
         except Student.DoesNotExist:
             # Check if already a pending student
             try:
-                pending = PendingStudent.objects.get(email=email)
+                pending = get_by_email(PendingStudent.objects.all(), email)
                 # Update pending student info if needed
                 if first_name:
                     pending.first_name = first_name
@@ -770,94 +829,19 @@ def update_class(request, pk):
         
         class_instance.save()
         
-        # Update students if provided
+        # Update students if provided, applying only the difference from the current roster
+        roster_changes = None
         if 'students' in request.data:
-            # Remove existing student associations
-            ClassStudent.objects.filter(class_instance=class_instance).delete()
-            
-            # Process each student
-            student_items = request.data.get('students', [])
-            faculty = class_instance.faculty
-            
-            for item in student_items:
-                try:
-                    if isinstance(item, str):
-                        # Handle UUID string (already registered student)
-                        try:
-                            student = Student.objects.get(id=item)
-                            ClassStudent.objects.create(
-                                class_instance=class_instance,
-                                student=student
-                            )
-                            print(f"Added registered student ID {item} to class")
-                        except Student.DoesNotExist:
-                            print(f"Student with ID {item} not found")
-                            # Check if it's a pending student ID
-                            try:
-                                pending_student = PendingStudent.objects.get(id=item)
-                                ClassStudent.objects.create(
-                                    class_instance=class_instance,
-                                    pending_student=pending_student
-                                )
-                                print(f"Added pending student ID {item} to class")
-                            except PendingStudent.DoesNotExist:
-                                print(f"Student with ID {item} not found")
-                        continue
-                    # Handle object format (from manual add or CSV)
-                    if isinstance(item, dict):
-                        email = item.get('email')
-                        if not email:
-                            print("Skipping student with no email")
-                            continue
-                        
-                        # First check if student is already registered
-                        registered_student = None
-                        pending_student = None
-                        try:
-                            registered_student = Student.objects.get(email=email)
-                            # If we find the student, create the class association
-                            ClassStudent.objects.create(
-                                class_instance=class_instance,
-                                student=registered_student
-                            )
-                            print(f"Added registered student {email} to class")
-                            continue  # Skip to next student
-                        except Student.DoesNotExist:
-                            # Student not registered, now check if they're pending
-                            try:
-                                pending_student = PendingStudent.objects.get(email=email)
-                                # Update pending student info if needed
-                                pending_student.first_name = item.get('firstName', item.get('first_name', pending_student.first_name))
-                                pending_student.last_name = item.get('lastName', item.get('last_name', pending_student.last_name))
-                                pending_student.student_id = item.get('studentId', item.get('student_id', pending_student.student_id))
-                                pending_student.save()
-                                print(f"Updated pending student {email}")
-                            except PendingStudent.DoesNotExist:
-                                # Create new pending student
-                                pending_student = PendingStudent.objects.create(
-                                    first_name=item.get('firstName', item.get('first_name', '')),
-                                    last_name=item.get('lastName', item.get('last_name', '')),
-                                    student_id=item.get('studentId', item.get('student_id', '')),
-                                    email=email,
-                                    school=faculty.school,
-                                    added_by=faculty
-                                )
-                                print(f"Created pending student {email}")
-                            # Create association with the pending student
-                            if pending_student:
-                                ClassStudent.objects.create(
-                                    class_instance=class_instance,
-                                    pending_student=pending_student
-                                )
-                                print(f"Added pending student {email} to ClassStudent table directly")
-                except Exception as e:
-                    print(f"Error processing student: {str(e)}")
-                    traceback.print_exc()
-                    continue
+            faculty = Faculty.objects.only('id', 'school_id').get(id=class_instance.faculty_id)
+            roster_changes = sync_roster(class_instance, faculty, request.data.get('students') or [])
+            print(f"Updated roster of class {class_instance.id}: "
+                  f"{roster_changes['added']} added, {roster_changes['removed']} removed, "
+                  f"{roster_changes['unchanged']} unchanged")
         
         return Response({
             'message': 'Class updated successfully',
-            'class': ClassSerializer(class_instance).data
+            'class': ClassSerializer(class_instance).data,
+            'roster': roster_changes
         })
     except Class.DoesNotExist:
         return Response({'error': 'Class not found'}, status=status.HTTP_404_NOT_FOUND)
@@ -872,72 +856,65 @@ class ClassEventViewSet(viewsets.ModelViewSet):
     serializer_class = ClassEventSerializer
 
     def get_queryset(self):
-        queryset = ClassEvent.objects.all()
+        queryset = ClassEvent.objects.select_related('event')
         class_instance = self.request.query_params.get('class_instance', None)
+        event = self.request.query_params.get('event', None)
         if class_instance is not None:
             queryset = queryset.filter(class_instance=class_instance)
+        if event is not None:
+            queryset = queryset.filter(event=event)
         return queryset
 
+@api_view(['POST'])
+def generate_event_qr_batch(request):
+    """Queue one PDF with the QR codes of a class's events or a list of events"""
+    class_id = request.data.get('class_id')
+    event_ids = request.data.get('event_ids')
+
+    if class_id:
+        events = Event.objects.filter(classevent__class_instance=class_id)
+    elif event_ids and isinstance(event_ids, list):
+        try:
+            events = Event.objects.filter(pk__in=[UUID(str(event_id)) for event_id in event_ids])
+        except ValueError:
+            return Response({'error': 'event_ids must be a list of event IDs'}, status=status.HTTP_400_BAD_REQUEST)
+    else:
+        return Response({'error': 'Either class_id or event_ids is required'}, status=status.HTTP_400_BAD_REQUEST)
+
+    events = events.only('id', 'name', 'date', 'end_time', 'location').order_by('date', 'id')
+    pages = [event_qr_fields(event) for event in events]
+    if not pages:
+        return Response({'error': 'No events found'}, status=status.HTTP_404_NOT_FOUND)
+
+    job_id = submit_qr_sheet(pages)
+    return Response({
+        'job_id': job_id,
+        'status': 'pending',
+        'pages': len(pages)
+    }, status=status.HTTP_202_ACCEPTED)
+
 @api_view(['GET'])
-def generate_event_qr(request, event_id):
-    """Generate a QR code PDF for an event"""
-    try:
-        # Convert string to UUID if needed
-        event_uuid = UUID(event_id)
-        # Get the event
-        event = Event.objects.get(pk=event_uuid)
-        # Create event attendance URL - this will be the data in the QR code
-        attendance_url = f"https://trueattend.onrender.com/attend/{event_id}"
-        # Generate QR code
-        qr = qrcode.QRCode(
-            version=1,
-            error_correction=qrcode.constants.ERROR_CORRECT_L,
-            box_size=10,
-            border=4,
-        )
-        qr.add_data(attendance_url)
-        qr.make(fit=True)
-        img = qr.make_image(fill_color="black", back_color="white")
-        # Create a byte buffer for the image
-        img_buffer = io.BytesIO()
-        img.save(img_buffer)
-        img_buffer.seek(0)
-        # Create a PDF
-        buffer = io.BytesIO()
-        pdf = canvas.Canvas(buffer, pagesize=letter)
-        # Add event details to PDF
-        pdf.setFont("Helvetica-Bold", 16)
-        pdf.drawString(1*inch, 10*inch, f"Event: {event.name}")
-        pdf.setFont("Helvetica", 12)
-        # Format and display date and time
-        event_date = event.date.strftime('%B %d, %Y')
-        start_time = event.date.strftime('%I:%M %p')
-        pdf.drawString(1*inch, 9.5*inch, f"Date: {event_date}")
-        if event.end_time:
-            end_time = event.end_time.strftime('%I:%M %p')
-            pdf.drawString(1*inch, 9.0*inch, f"Time: {start_time} - {end_time}")
-        else:
-            pdf.drawString(1*inch, 9.0*inch, f"Time: {start_time}")
-        if event.location:
-            pdf.drawString(1*inch, 8.5*inch, f"Location: {event.location}")
-        pdf.setFont("Helvetica-Bold", 14)
-        pdf.drawString(1*inch, 8.0*inch, "Instructions:")
-        pdf.setFont("Helvetica", 12)
-        pdf.drawString(1*inch, 7.5*inch, "1. Print this QR code and display it in class")
-        pdf.drawString(1*inch, 7.0*inch, "2. Have students scan this code with the ClassAttend app")
-        pdf.drawString(1*inch, 6.5*inch, "3. Students must be logged in to record attendance")
-        # Add QR code to PDF
-        img_pil = Image.open(img_buffer)
-        pdf.drawInlineImage(img_pil, 2.5*inch, 2*inch, width=4*inch, height=4*inch)
-        pdf.save()
-        buffer.seek(0)
-        response = HttpResponse(buffer, content_type='application/pdf')
-        response['Content-Disposition'] = f'attachment; filename="event_{event_id}_qr.pdf"'
-        return response
-    except Event.DoesNotExist:
-        return Response({'error': 'Event not found'}, status=status.HTTP_404_NOT_FOUND)
-    except Exception as e:
-        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+def qr_batch_status(request, job_id):
+    """Report the progress of a queued QR sheet"""
+    job = get_job(job_id)
+    if job is None:
+        return Response({'error': 'Job not found'}, status=status.HTTP_404_NOT_FOUND)
+    return Response(job)
+
+@api_view(['GET'])
+def qr_batch_download(request, job_id):
+    """Download a finished QR sheet"""
+    job = get_job(job_id)
+    if job is None:
+        return Response({'error': 'Job not found'}, status=status.HTTP_404_NOT_FOUND)
+    if job['status'] != 'done':
+        return Response({'error': f"Job is {job['status']}"}, status=status.HTTP_409_CONFLICT)
+    return FileResponse(
+        open(qr_job_pdf_path(job_id), 'rb'),
+        as_attachment=True,
+        filename=f"qr_codes_{job_id}.pdf",
+        content_type='application/pdf'
+    )
 
 @api_view(['PUT'])
 def update_faculty_profile(request, pk):
@@ -988,46 +965,50 @@ def update_student_profile(request, pk):
 
 @api_view(['GET'])
 def get_class_event_attendance(request, event_id, class_id):
-    """Get attendance data for a specific event and class"""
+    """Get present and absent students of a class for a specific event"""
     try:
-        class_instance = Class.objects.get(pk=class_id)
-        event = Event.objects.get(pk=event_id)
+        class_instance = Class.objects.only('id', 'faculty_id').get(pk=class_id)
+        if not Event.objects.filter(pk=event_id).exists():
+            raise Event.DoesNotExist
         if request.user.is_authenticated and hasattr(request.user, 'faculty'):
-            faculty = request.user.faculty
+            faculty_id = request.user.faculty.id
         else:
             faculty_id = request.query_params.get('faculty_id')
-            if faculty_id:
-                faculty = Faculty.objects.get(pk=faculty_id)
-            else:
+            if not faculty_id:
                 return Response({"error": "Faculty authentication required"}, status=401)
-        if class_instance.faculty.id != faculty.id:
+        if str(class_instance.faculty_id) != str(faculty_id):
             return Response({"error": "You do not have permission to access this data"}, status=403)
-        class_students = ClassStudent.objects.filter(class_instance=class_instance)
-        student_ids = [cs.student.id for cs in class_students]
-        attendance_records = Attendance.objects.filter(
-            event=event,
-            student__id__in=student_ids
-        ).select_related('student')
+
+        # One LEFT JOIN from the roster to this event's attendance rows, so absent
+        # and pending students come back alongside the ones who scanned in
+        roster = ClassStudent.objects.filter(class_instance=class_instance).annotate(
+            scan=FilteredRelation('student__attendance', condition=Q(student__attendance__event_id=event_id))
+        ).order_by('id').values(
+            'student_id', 'student__first_name', 'student__last_name', 'student__email', 'student__student_id',
+            'pending_student_id', 'pending_student__first_name', 'pending_student__last_name',
+            'pending_student__email', 'pending_student__student_id',
+            'scan__id', 'scan__scanned_at', 'scan__location', 'scan__device_id',
+        )
         attendance_data = []
-        for record in attendance_records:
+        for row in roster:
+            prefix = 'student' if row['student_id'] else 'pending_student'
             attendance_data.append({
-                'student_id': record.student.id,
-                'first_name': record.student.first_name,
-                'last_name': record.student.last_name,
-                'email': record.student.email,
-                'student_id_number': record.student.student_id,
-                'attended': True,
-                'scanned_at': record.scanned_at,
-                'location': record.location,
-                'device_id': record.device_id
+                'student_id': row[f'{prefix}_id'],
+                'first_name': row[f'{prefix}__first_name'],
+                'last_name': row[f'{prefix}__last_name'],
+                'email': row[f'{prefix}__email'],
+                'student_id_number': row[f'{prefix}__student_id'],
+                'registered': bool(row['student_id']),
+                'attended': row['scan__id'] is not None,
+                'scanned_at': row['scan__scanned_at'],
+                'location': row['scan__location'],
+                'device_id': row['scan__device_id']
             })
         return Response(attendance_data)
     except Class.DoesNotExist:
         return Response({"error": "Class not found"}, status=404)
     except Event.DoesNotExist:
         return Response({"error": "Event not found"}, status=404)
-    except Faculty.DoesNotExist:
-        return Response({"error": "Faculty not found"}, status=404)
     except Exception as e:
         return Response({"error": str(e)}, status=500)
 
@@ -1047,24 +1028,181 @@ def delete_student_account(request, pk):
 
 @api_view(['GET'])
 def get_student_attendance(request, student_id):
-    """Get attendance history for a specific student"""
+    """Get attendance history for a specific student.
+
+    Optional filters: ?semester= and ?class= limit the history to events of
+    the student's classes in that semester, or of one class. Send ?page_size=
+    (then follow ?cursor=) to page through it newest first.
+    """
     try:
-        student = Student.objects.get(pk=student_id)
-        attendance_records = Attendance.objects.filter(student=student).order_by('-scanned_at')
-        attendance_data = []
-        for record in attendance_records:
-            event = record.event
-            attendance_data.append({
-                'id': str(record.id),
-                'event_id': str(event.id),
-                'event_name': event.name,
-                'event_date': event.date,
-                'event_end_time': event.end_time,
-                'event_location': event.location or 'No location specified',
-                'scanned_at': record.scanned_at,
-            })
-        return Response(attendance_data)
-    except Student.DoesNotExist:
-        return Response({"error": "Student not found"}, status=status.HTTP_404_NOT_FOUND)
+        if not Student.objects.filter(pk=student_id).exists():
+            return Response({"error": "Student not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        attendance_records = Attendance.objects.filter(student_id=student_id)
+        semester = request.query_params.get('semester')
+        class_id = request.query_params.get('class')
+        if semester or class_id:
+            class_events = ClassEvent.objects.all()
+            if semester:
+                class_events = class_events.filter(class_instance__semester=semester)
+            if class_id:
+                class_events = class_events.filter(class_instance_id=class_id)
+            # A subquery rather than a join, so an event shared by several classes appears once
+            attendance_records = attendance_records.filter(event__in=class_events.values('event_id'))
+
+        attendance_records = attendance_records.order_by('-scanned_at', '-id').values(
+            'id',
+            'event_id',
+            'scanned_at',
+            event_name=F('event__name'),
+            event_date=F('event__date'),
+            event_end_time=F('event__end_time'),
+            event_location=F('event__location'),
+        )
+
+        paginator = StudentAttendancePagination()
+        page = paginator.paginate_queryset(attendance_records, request)
+        attendance_data = list(attendance_records) if page is None else page
+        for record in attendance_data:
+            record['id'] = str(record['id'])
+            record['event_id'] = str(record['event_id'])
+            record['event_location'] = record['event_location'] or 'No location specified'
+
+        if page is None:
+            return Response(attendance_data)
+        return paginator.get_paginated_response(attendance_data)
+    except (ValueError, ValidationError) as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
     except Exception as e:
-        return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file
+        return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+# ---------------- Attendance Export ----------------
+EXPORT_CHUNK_SIZE = 2000
+
+EXPORT_STUDENT_COLUMNS = [
+    ('Student ID', 'student__student_id'),
+    ('First Name', 'student__first_name'),
+    ('Last Name', 'student__last_name'),
+    ('Email', 'student__email'),
+    ('Scanned At', 'scanned_at'),
+    ('Location', 'location'),
+    ('Device ID', 'device_id'),
+]
+
+
+class _Echo:
+    """File-like object that hands each CSV line back to the caller instead of buffering it"""
+    def write(self, value):
+        return value
+
+
+def _attendance_csv_chunks(queryset, columns):
+    """CSV text a chunk of rows at a time, read through a server-side cursor"""
+    rows = queryset.values_list(*[field for _, field in columns])
+    writer = csv.writer(_Echo())
+    yield writer.writerow([label for label, _ in columns])
+    # Server-side cursors only survive the Supabase transaction pooler inside a transaction
+    with transaction.atomic():
+        chunk = []
+        for row in rows.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+            chunk.append(writer.writerow([value.isoformat() if isinstance(value, datetime) else value for value in row]))
+            if len(chunk) >= EXPORT_CHUNK_SIZE:
+                yield ''.join(chunk)
+                chunk = []
+        if chunk:
+            yield ''.join(chunk)
+
+
+async def _aiterate(chunks):
+    """Step a sync generator from the event loop, one chunk per trip to the sync thread.
+
+    Every step runs on the request's thread-sensitive thread, so the cursor and
+    its transaction stay on one connection; closing the generator there rolls
+    the transaction back if the client goes away mid-download.
+    """
+    step = sync_to_async(next)
+    done = object()
+    try:
+        while True:
+            chunk = await step(chunks, done)
+            if chunk is done:
+                return
+            yield chunk
+    finally:
+        await sync_to_async(chunks.close)()
+
+
+def _stream_attendance_csv(request, queryset, columns, filename):
+    """Stream a queryset as CSV without materializing it in memory"""
+    chunks = _attendance_csv_chunks(queryset, columns)
+    # ASGI drains sync iterators into a list before sending, WSGI does the same to async ones
+    if isinstance(request._request, ASGIRequest):
+        chunks = _aiterate(chunks)
+    response = StreamingHttpResponse(chunks, content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+@api_view(['GET'])
+def export_event_attendance(request, event_id):
+    """Stream every attendance record for an event as CSV"""
+    try:
+        event = Event.objects.only('id', 'name', 'faculty_id').get(pk=event_id)
+        if str(event.faculty_id) != str(request.query_params.get('faculty_id')):
+            return Response({"error": "You do not have permission to access this data"}, status=403)
+        queryset = Attendance.objects.filter(event=event).order_by('scanned_at', 'id')
+        return _stream_attendance_csv(request, queryset, EXPORT_STUDENT_COLUMNS, f"event_{event_id}_attendance.csv")
+    except Event.DoesNotExist:
+        return Response({"error": "Event not found"}, status=404)
+
+
+@api_view(['GET'])
+def export_class_attendance(request, class_id):
+    """Stream the attendance of a class's students at all of its events as CSV"""
+    try:
+        class_instance = Class.objects.only('id', 'faculty_id').get(pk=class_id)
+        if str(class_instance.faculty_id) != str(request.query_params.get('faculty_id')):
+            return Response({"error": "You do not have permission to access this data"}, status=403)
+        queryset = Attendance.objects.filter(
+            event__classevent__class_instance=class_instance,
+            student__classstudent__class_instance=class_instance,
+        ).order_by('event__date', 'event_id', 'scanned_at', 'id')
+        columns = [('Event', 'event__name'), ('Event Date', 'event__date')] + EXPORT_STUDENT_COLUMNS
+        return _stream_attendance_csv(request, queryset, columns, f"class_{class_id}_attendance.csv")
+    except Class.DoesNotExist:
+        return Response({"error": "Class not found"}, status=404)
+
+
+@api_view(['GET'])
+def export_school_attendance(request, school_id):
+    """Stream a school's class attendance as CSV, optionally for a single ?semester="""
+    try:
+        faculty_id = UUID(request.query_params.get('faculty_id', ''))
+    except ValueError:
+        faculty_id = None
+    if not faculty_id or not Faculty.objects.filter(pk=faculty_id, school_id=school_id).exists():
+        return Response({"error": "You do not have permission to access this data"}, status=403)
+
+    class_events = ClassEvent.objects.filter(class_instance__school_id=school_id)
+    semester = request.query_params.get('semester')
+    if semester:
+        class_events = class_events.filter(class_instance__semester=semester)
+
+    # One row per class an attended event belongs to, limited to that class's roster
+    queryset = Attendance.objects.filter(
+        event__classevent__in=class_events,
+        student__classstudent__class_instance=F('event__classevent__class_instance'),
+    ).order_by('event__classevent__class_instance', 'event__date', 'event_id', 'scanned_at', 'id')
+    columns = [
+        ('Class', 'event__classevent__class_instance__name'),
+        ('Semester', 'event__classevent__class_instance__semester'),
+        ('Event', 'event__name'),
+        ('Event Date', 'event__date'),
+    ] + EXPORT_STUDENT_COLUMNS
+    filename = f"school_{school_id}_{semester or 'all'}_attendance.csv".replace(' ', '_')
+    return _stream_attendance_csv(request, queryset, columns, filename)
+
+# ---------------- Read Cache Stats ----------------
+@api_view(['GET'])
+def read_cache_stats(request):
+    """Hit rates of the read-through cache in the process that serves the request"""
+    return Response(cache_stats())
@@ -167,6 +167,8 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.AllowAny',
     ],
+    # Opt-in: lists are paginated when the client sends ?page_size= or ?cursor=
+    'DEFAULT_PAGINATION_CLASS': 'api.pagination.OptionalCursorPagination',
 }
 
 # Supabase settings
@@ -182,5 +184,44 @@ EMAIL_HOST_USER = os.getenv('EMAIL_HOST_USER')
 EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD')
 DEFAULT_FROM_EMAIL = os.getenv('EMAIL_HOST_USER')
 
+# Outgoing mail is queued in the database and sent by `manage.py send_queued_mail`
+MAIL_QUEUE_BATCH_SIZE = int(os.getenv('MAIL_QUEUE_BATCH_SIZE', '50'))
+MAIL_QUEUE_MAX_ATTEMPTS = int(os.getenv('MAIL_QUEUE_MAX_ATTEMPTS', '5'))
+# Claims older than this (a worker died mid-send) are picked up again
+MAIL_QUEUE_CLAIM_TIMEOUT = int(os.getenv('MAIL_QUEUE_CLAIM_TIMEOUT', '600'))
+
+# Attendance write-behind: acknowledge scans immediately and write them in batches
+ATTENDANCE_WRITE_BEHIND = os.getenv('ATTENDANCE_WRITE_BEHIND', 'False') == 'True'
+ATTENDANCE_FLUSH_INTERVAL_MS = int(os.getenv('ATTENDANCE_FLUSH_INTERVAL_MS', '250'))
+ATTENDANCE_FLUSH_MAX_ROWS = int(os.getenv('ATTENDANCE_FLUSH_MAX_ROWS', '200'))
+ATTENDANCE_SPOOL_DIR = os.getenv('ATTENDANCE_SPOOL_DIR', os.path.join(BASE_DIR, 'spool'))
+
+# Multi-event QR sheets are rendered in a process pool and kept on local disk
+QR_JOB_DIR = os.getenv('QR_JOB_DIR', os.path.join(BASE_DIR, 'qr_jobs'))
+QR_JOB_WORKERS = int(os.getenv('QR_JOB_WORKERS', '2'))
+QR_JOB_TTL = int(os.getenv('QR_JOB_TTL', str(60 * 60 * 24)))
+# Unfinished jobs older than this are reported as failed
+QR_JOB_TIMEOUT = int(os.getenv('QR_JOB_TIMEOUT', str(60 * 10)))
+
+# Live attendance feed: with NOTIFY on, scans reach screens served by any worker.
+# LISTEN needs a session connection, so it uses the session pooler port
+ATTENDANCE_LIVE_NOTIFY = os.getenv('ATTENDANCE_LIVE_NOTIFY', 'False') == 'True'
+ATTENDANCE_LIVE_LISTEN_PORT = os.getenv('ATTENDANCE_LIVE_LISTEN_PORT', '5432')
+
+# Read-through cache for event detail, schools and rosters. In-process LRU by
+# default; set READ_CACHE_REDIS_URL to share it between workers (needs `redis`)
+READ_CACHE_TTL = int(os.getenv('READ_CACHE_TTL', '300'))
+READ_CACHE_MAX_ENTRIES = int(os.getenv('READ_CACHE_MAX_ENTRIES', '5000'))
+READ_CACHE_ALIAS = ''
+if os.getenv('READ_CACHE_REDIS_URL'):
+    CACHES = {
+        'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+        'read': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('READ_CACHE_REDIS_URL'),
+        },
+    }
+    READ_CACHE_ALIAS = 'read'
+
 # Frontend URL - update this based on environment
 FRONTEND_URL = os.getenv('FRONTEND_URL', 'http://localhost:3000')
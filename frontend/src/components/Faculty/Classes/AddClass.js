@@ -106,40 +106,34 @@ const AddClass = () => {
         return;
       }
       
-      // Process each student - use our dedicated faculty-add-student endpoint
-      const studentIds = [];
-      
-      for (const student of students) {
-        try {
-          // Use our new endpoint for faculty adding students
-          const addStudentResponse = await axios.post('/api/faculty/add-student/', {
-            email: student.email,
-            firstName: student.firstName,
-            lastName: student.lastName, 
-            studentId: student.studentId,
-            faculty_id: facultyId,
-            school_id: schoolId
-          });
-          
-          if (addStudentResponse.data && addStudentResponse.data.id) {
-            studentIds.push(addStudentResponse.data.id);
-            console.log(`Added student ${student.email} with status: ${addStudentResponse.data.status}`);
-          }
-        } catch (error) {
-          console.error(`Error processing student ${student.email}:`, error);
-        }
-      }
-      
       // Create the class - ensure semester is sent directly
       const classResponse = await axios.post('/api/class/create/', {
         name: classData.name,
         faculty_id: facultyId,
         metadata: JSON.stringify({}), // Empty metadata since we removed those fields
-        students: studentIds,
         semester: classData.semester,
         school: schoolId
       });
       
+      // Add the whole roster in a single request
+      if (students.length > 0) {
+        const classId = classResponse.data.class.id;
+        const importResponse = await axios.post(`/api/classes/${classId}/roster/import/`, {
+          faculty_id: facultyId,
+          students: students.map(student => ({
+            email: student.email,
+            first_name: student.firstName,
+            last_name: student.lastName,
+            student_id: student.studentId
+          }))
+        });
+        
+        const failed = importResponse.data.results.filter(result => result.status === 'error');
+        failed.forEach(result => {
+          console.error(`Error processing student ${result.email}:`, result.error);
+        });
+      }
+      
       setSuccess('Class created successfully!');
       setOpenSnackbar(true);
       
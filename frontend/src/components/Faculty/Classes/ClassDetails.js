@@ -37,6 +37,7 @@ import EventIcon from '@mui/icons-material/Event';
 import PeopleIcon from '@mui/icons-material/People';
 import { useParams, useNavigate } from 'react-router-dom';
 import axios from '../../../utils/axios';
+import { fetchEventsPage } from '../../../utils/events';
 import { getApiUrl } from '../../../utils/urlHelper';
 import CalendarTodayIcon from '@mui/icons-material/CalendarToday';
 import AccessTimeIcon from '@mui/icons-material/AccessTime';
@@ -69,11 +70,16 @@ const ClassDetails = () => {
   const [assignmentLoading, setAssignmentLoading] = useState(false);
   const [assignmentError, setAssignmentError] = useState('');
   const [assignmentSuccess, setAssignmentSuccess] = useState('');
+  const [eventsCursor, setEventsCursor] = useState(null);
+  const [loadingMoreEvents, setLoadingMoreEvents] = useState(false);
 
   const [unassignDialogOpen, setUnassignDialogOpen] = useState(false);
   const [eventToUnassign, setEventToUnassign] = useState(null);
   const [unassignLoading, setUnassignLoading] = useState(false);
 
+  // Check-in counts for events whose check-in window is open, pushed by the server
+  const [liveCounts, setLiveCounts] = useState({});
+
   useEffect(() => {
     const fetchClassDetails = async () => {
       if (hasLoadedRef.current) return;
@@ -88,11 +94,7 @@ const ClassDetails = () => {
         try {
           const eventsResponse = await axios.get(`/api/class-events/?class_instance=${id}`);
           if (eventsResponse.data && eventsResponse.data.length > 0) {
-            const eventPromises = eventsResponse.data.map(item =>
-              axios.get(`/api/events/${item.event}/`)
-            );
-            const eventResults = await Promise.all(eventPromises);
-            setEvents(eventResults.map(res => res.data));
+            setEvents(eventsResponse.data.map(item => item.event_details));
           } else {
             setEvents([]);
           }
@@ -102,66 +104,18 @@ const ClassDetails = () => {
         }
 
         try {
-          // Get all class-student relationships for this class
-          const classStudentsResponse = await axios.get(`/api/class-students/?class_instance=${id}`);
+          // Registered and pending students come back together from the roster endpoint
+          const rosterResponse = await axios.get(`/api/class-students/roster/?class_instance=${id}`);
           
-          if (classStudentsResponse.data && Array.isArray(classStudentsResponse.data) && classStudentsResponse.data.length > 0) {
-            console.log("ClassStudent data:", classStudentsResponse.data); // Debug data structure
-            
-            const studentPromises = classStudentsResponse.data.map(relation => {
-              // The relation might have different structure than expected
-              // Let's check what fields are available in the response
-              console.log("ClassStudent relation:", relation);
-              
-              if (relation.student) {
-                // This is a registered student
-                return axios.get(`/api/students/${relation.student}/`)
-                  .then(res => ({
-                    id: res.data.id,
-                    firstName: res.data.first_name,
-                    lastName: res.data.last_name,
-                    studentId: res.data.student_id,
-                    email: res.data.email,
-                    email_verified: true,
-                  }))
-                  .catch(err => {
-                    console.error(`Error fetching registered student ${relation.student}:`, err);
-                    return null;
-                  });
-              } else if (relation.pending_student) {
-                // This is a pending/non-registered student
-                return axios.get(`/api/pending-students/${relation.pending_student}/`)
-                  .then(res => ({
-                    id: res.data.id,
-                    firstName: res.data.first_name,
-                    lastName: res.data.last_name,
-                    studentId: res.data.student_id,
-                    email: res.data.email,
-                    email_verified: false,
-                  }))
-                  .catch(err => {
-                    console.error(`Error fetching pending student ${relation.pending_student}:`, err);
-                    return null;
-                  });
-              } else if (relation.student_info) {
-                // Alternative: If the API returns nested student info directly
-                const info = relation.student_info;
-                return Promise.resolve({
-                  id: info.id,
-                  firstName: info.first_name,
-                  lastName: info.last_name,
-                  studentId: info.student_id,
-                  email: info.email,
-                  email_verified: info.registered || false,
-                });
-              }
-              return Promise.resolve(null); // For any relationships without valid IDs
-            });
-            
-            const studentResults = await Promise.all(studentPromises);
-            const validStudents = studentResults.filter(student => student !== null);
-            console.log("Processed students:", validStudents);
-            setStudents(validStudents);
+          if (rosterResponse.data && Array.isArray(rosterResponse.data)) {
+            setStudents(rosterResponse.data.map(info => ({
+              id: info.id,
+              firstName: info.first_name,
+              lastName: info.last_name,
+              studentId: info.student_id,
+              email: info.email,
+              email_verified: info.registered,
+            })));
           } else {
             console.log("No class-students found for class ID:", id);
             setStudents([]);
@@ -184,6 +138,34 @@ const ClassDetails = () => {
     }
   }, [id]);
 
+  useEffect(() => {
+    const facultyId = localStorage.getItem('facultyId');
+    const now = new Date();
+    const liveEvents = events.filter(event => {
+      const start = new Date(event.date).getTime();
+      const opens = start - (event.checkin_before_minutes || 0) * 60000;
+      const closes = start + (event.checkin_after_minutes || 0) * 60000;
+      return now >= opens && now <= closes;
+    });
+
+    // One long-lived stream per live event instead of re-fetching attendance
+    const sources = liveEvents.map(event => {
+      const seen = new Set();
+      setLiveCounts(prev => ({ ...prev, [event.id]: 0 }));
+      const source = new EventSource(getApiUrl(`/api/attendance/event/${event.id}/live/?faculty_id=${facultyId}`));
+      source.addEventListener('attendance', (message) => {
+        const record = JSON.parse(message.data);
+        if (!seen.has(record.id)) {
+          seen.add(record.id);
+          setLiveCounts(prev => ({ ...prev, [event.id]: seen.size }));
+        }
+      });
+      return source;
+    });
+
+    return () => sources.forEach(source => source.close());
+  }, [events]);
+
   const handleTabChange = (event, newValue) => {
     setTabValue(newValue);
   };
@@ -193,25 +175,9 @@ const ClassDetails = () => {
       setAssignmentLoading(true);
       setAssignmentError('');
 
-      const schoolId = localStorage.getItem('schoolId');
-
-      const eventsResponse = await axios.get(`/api/events/?school=${schoolId}`);
-
-      if (!eventsResponse.data || !Array.isArray(eventsResponse.data)) {
-        throw new Error('Invalid events data received');
-      }
-
-      const now = new Date();
-      const futureEvents = eventsResponse.data.filter(event => {
-        const eventDate = new Date(event.date);
-        return eventDate >= now;
-      });
-
-      const assignedEventIds = new Set(events.map(event => event.id));
-
-      const unassignedEvents = futureEvents.filter(event => !assignedEventIds.has(event.id));
-
-      setAvailableEvents(unassignedEvents);
+      const page = await fetchEventsPage(localStorage.getItem('schoolId'), { upcomingOnly: true });
+      setAvailableEvents(unassignedUpcoming(page.events));
+      setEventsCursor(page.nextCursor);
       setSelectedEvents([]);
       setAssignDialogOpen(true);
     } catch (err) {
@@ -222,6 +188,27 @@ const ClassDetails = () => {
     }
   };
 
+  // Upcoming events that aren't assigned to this class yet
+  const unassignedUpcoming = (pageEvents) => {
+    const now = new Date();
+    const assignedEventIds = new Set(events.map(event => event.id));
+    return pageEvents.filter(event => new Date(event.date) >= now && !assignedEventIds.has(event.id));
+  };
+
+  const handleLoadMoreEvents = async () => {
+    try {
+      setLoadingMoreEvents(true);
+      const page = await fetchEventsPage(localStorage.getItem('schoolId'), { cursor: eventsCursor, upcomingOnly: true });
+      setAvailableEvents(previous => [...previous, ...unassignedUpcoming(page.events)]);
+      setEventsCursor(page.nextCursor);
+    } catch (err) {
+      console.error('Error fetching more events:', err);
+      setAssignmentError('Failed to load available events');
+    } finally {
+      setLoadingMoreEvents(false);
+    }
+  };
+
   const handleEventSelectionChange = (event) => {
     setSelectedEvents(event.target.value);
   };
@@ -245,11 +232,7 @@ const ClassDetails = () => {
 
       const eventsResponse = await axios.get(`/api/class-events/?class_instance=${id}`);
       if (eventsResponse.data && eventsResponse.data.length > 0) {
-        const eventPromises = eventsResponse.data.map(item =>
-          axios.get(`/api/events/${item.event}/`)
-        );
-        const eventResults = await Promise.all(eventPromises);
-        setEvents(eventResults.map(res => res.data));
+        setEvents(eventsResponse.data.map(item => item.event_details));
       }
     } catch (err) {
       console.error('Error assigning events:', err);
@@ -325,22 +308,14 @@ const ClassDetails = () => {
         return;
       }
       
-      const eventIds = eventsResponse.data.map(item => item.event);
-      const uniqueEventIds = [...new Set(eventIds)]; // Remove any potential duplicates
-      
-      // Fetch each event's full details
-      const eventPromises = uniqueEventIds.map(eventId =>
-        axios.get(`/api/events/${eventId}/`).catch(err => {
-          console.error(`Error fetching event ${eventId}:`, err);
-          return { data: null }; // Return null for failed requests
-        })
-      );
-      
-      const eventResults = await Promise.all(eventPromises);
-      const validEvents = eventResults
-        .filter(res => res.data !== null)
-        .map(res => res.data);
-      setEvents(validEvents);
+      // Event details are embedded in each class-event relationship
+      const uniqueEvents = new Map();
+      eventsResponse.data.forEach(item => {
+        if (item.event_details) {
+          uniqueEvents.set(item.event_details.id, item.event_details);
+        }
+      });
+      setEvents([...uniqueEvents.values()]);
     } catch (err) {
       console.error('Error refreshing events:', err);
       // Optionally show an error message to the user
@@ -445,8 +420,9 @@ const ClassDetails = () => {
           });
         }
 
+        // The response covers the whole roster, so absent students are included too
         attendanceMap[record.student_id] = {
-          attended: true,
+          attended: record.attended,
           scanned_at: formattedTimestamp,
           location: record.location || '',
           device_id: record.device_id || '',
@@ -641,6 +617,20 @@ const ClassDetails = () => {
                                     mb: 1,
                                   }}
                                 />
+                                {liveCounts[event.id] !== undefined && (
+                                  <Chip
+                                    label={`Live: ${liveCounts[event.id]} of ${students.length} checked in`}
+                                    size="small"
+                                    sx={{
+                                      bgcolor: '#fff8e1',
+                                      color: '#DEA514',
+                                      fontWeight: 'medium',
+                                      border: '1px solid #DEA514',
+                                      alignSelf: 'flex-start',
+                                      mb: 1,
+                                    }}
+                                  />
+                                )}
                                 <Typography
                                   variant="h6"
                                   sx={{
@@ -841,6 +831,20 @@ const ClassDetails = () => {
                                     mb: 1,
                                   }}
                                 />
+                                {liveCounts[event.id] !== undefined && (
+                                  <Chip
+                                    label={`Live: ${liveCounts[event.id]} of ${students.length} checked in`}
+                                    size="small"
+                                    sx={{
+                                      bgcolor: '#fff8e1',
+                                      color: '#DEA514',
+                                      fontWeight: 'medium',
+                                      border: '1px solid #DEA514',
+                                      alignSelf: 'flex-start',
+                                      mb: 1,
+                                    }}
+                                  />
+                                )}
                                 <Typography
                                   variant="h6"
                                   sx={{
@@ -1115,12 +1119,22 @@ const ClassDetails = () => {
                 })
               )}
             </Select>
-            {availableEvents.length === 0 && (
+            {availableEvents.length === 0 && !eventsCursor && (
               <FormHelperText>
                 No unassigned upcoming events available
               </FormHelperText>
             )}
           </FormControl>  
+          {eventsCursor && (
+            <Button
+              size="small"
+              onClick={handleLoadMoreEvents}
+              disabled={loadingMoreEvents}
+              sx={{ mt: 1, color: '#DEA514' }}
+            >
+              {loadingMoreEvents ? 'Loading...' : 'Load more events'}
+            </Button>
+          )}
         </DialogContent>
         <DialogActions>
           <Button 
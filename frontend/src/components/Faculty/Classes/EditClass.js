@@ -69,58 +69,16 @@ const EditClass = () => {
         
         // Fetch students enrolled in this class using class-students endpoint
         try {
-          const classStudentsResponse = await axios.get(`/api/class-students/?class_instance=${id}`);
+          const rosterResponse = await axios.get(`/api/class-students/roster/?class_instance=${id}`);
           
-          if (classStudentsResponse.data && Array.isArray(classStudentsResponse.data) && classStudentsResponse.data.length > 0) {
-            console.log("Found class-students:", classStudentsResponse.data);
-            
-            const studentPromises = classStudentsResponse.data.map(relation => {
-              if (relation.student) {
-                // This is a registered student
-                return axios.get(`/api/students/${relation.student}/`)
-                  .then(res => ({
-                    id: res.data.id,
-                    firstName: res.data.first_name,
-                    lastName: res.data.last_name,
-                    studentId: res.data.student_id,
-                    email: res.data.email
-                  }))
-                  .catch(err => {
-                    console.error(`Error fetching registered student ${relation.student}:`, err);
-                    return null;
-                  });
-              } else if (relation.pending_student) {
-                // This is a pending/non-registered student
-                return axios.get(`/api/pending-students/${relation.pending_student}/`)
-                  .then(res => ({
-                    id: res.data.id,
-                    firstName: res.data.first_name,
-                    lastName: res.data.last_name,
-                    studentId: res.data.student_id,
-                    email: res.data.email
-                  }))
-                  .catch(err => {
-                    console.error(`Error fetching pending student ${relation.pending_student}:`, err);
-                    return null;
-                  });
-              } else if (relation.student_info) {
-                // Alternative: If the API returns nested student info directly
-                const info = relation.student_info;
-                return Promise.resolve({
-                  id: info.id,
-                  firstName: info.first_name,
-                  lastName: info.last_name,
-                  studentId: info.student_id,
-                  email: info.email
-                });
-              }
-              return Promise.resolve(null);
-            });
-            
-            const studentResults = await Promise.all(studentPromises);
-            const formattedStudents = studentResults.filter(student => student !== null);
-            console.log("Processed students for EditClass:", formattedStudents);
-            setStudents(formattedStudents);
+          if (rosterResponse.data && Array.isArray(rosterResponse.data)) {
+            setStudents(rosterResponse.data.map(info => ({
+              id: info.id,
+              firstName: info.first_name,
+              lastName: info.last_name,
+              studentId: info.student_id,
+              email: info.email
+            })));
           } else {
             console.log("No students found for class:", id);
             setStudents([]);
@@ -191,36 +149,16 @@ const EditClass = () => {
         return;
       }
       
-      // Process each student - use our dedicated faculty-add-student endpoint
-      const studentIds = [];
-      
-      for (const student of students) {
-        if (student.id) {
-          // If student already has an ID, they're an existing student
-          studentIds.push(student.id);
-        } else {
-          try {
-            // Use the new faculty-add-student endpoint which always creates/updates pending students
-            // Pass the class ID to immediately associate the student with the class
-            const addStudentResponse = await axios.post('/api/faculty/add-student/', {
-              email: student.email,
-              firstName: student.firstName,
-              lastName: student.lastName,
-              studentId: student.studentId,
-              faculty_id: facultyId,
-              school_id: schoolId,
-              class_id: id  // Pass the class ID directly so backend can create ClassStudent entry
-            });
-            
-            if (addStudentResponse.data && addStudentResponse.data.id) {
-              studentIds.push(addStudentResponse.data.id);
-              console.log(`Added student ${student.email} with status: ${addStudentResponse.data.status}`);
-            }
-          } catch (error) {
-            console.error(`Error processing student ${student.email}:`, error);
-          }
+      // Existing students are sent by ID and new ones as roster entries; the
+      // backend only adds and removes the students that changed
+      const studentIds = students.map(student => (
+        student.id ? student.id : {
+          email: student.email,
+          first_name: student.firstName,
+          last_name: student.lastName,
+          student_id: student.studentId
         }
-      }
+      ));
       
       // Prepare the payload - include semester field directly
       const payload = {
@@ -38,6 +38,7 @@ import AccessTimeIcon from '@mui/icons-material/AccessTime';
 import { useNavigate } from 'react-router-dom';
 import axios from '../../../utils/axios';
 import { getApiUrl } from '../../../utils/urlHelper';
+import { fetchEventsPage } from '../../../utils/events';
 
 const EventsList = () => {
   const theme = useTheme();
@@ -55,30 +56,30 @@ const EventsList = () => {
   const [error, setError] = useState(null);
   const [searchQuery, setSearchQuery] = useState('');
   const [showPastEvents, setShowPastEvents] = useState(false);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
 
-  // Fetch events and classes on component mount
+  // Load the first page of events, soonest first; past events are only requested when shown
+  const loadEvents = async () => {
+    const schoolId = localStorage.getItem('schoolId');
+    if (!schoolId) {
+      throw new Error('School ID not found. You may need to log in again.');
+    }
+    const page = await fetchEventsPage(schoolId, { upcomingOnly: !showPastEvents });
+    setAllEvents(page.events);
+    setNextCursor(page.nextCursor);
+  };
+
+  // Fetch events and classes on component mount, and events again when past events are toggled
   useEffect(() => {
     const fetchData = async () => {
       setLoading(true);
       try {
-        // Get school ID from localStorage
         const schoolId = localStorage.getItem('schoolId');
         const facultyId = localStorage.getItem('facultyId');
-        
-        if (!schoolId) {
-          throw new Error('School ID not found. You may need to log in again.');
-        }
-        
-        // Fetch events with school filter
-        const eventsResponse = await axios.get(`/api/events/?school=${schoolId}`);
-        
-        // Sort events by date (nearest first)
-        const sortedEvents = [...eventsResponse.data].sort((a, b) => {
-          return new Date(a.date) - new Date(b.date);
-        });
-        
-        setAllEvents(sortedEvents);
-        
+
+        await loadEvents();
+
         // Fetch classes for this school AND faculty
         const classesResponse = await axios.get(`/api/classes/?school=${schoolId}&faculty=${facultyId}`);
         setClasses(classesResponse.data);
@@ -96,7 +97,24 @@ const EventsList = () => {
     };
     
     fetchData();
-  }, []);
+  }, [showPastEvents]);
+
+  const handleLoadMore = async () => {
+    setLoadingMore(true);
+    try {
+      const page = await fetchEventsPage(localStorage.getItem('schoolId'), {
+        cursor: nextCursor,
+        upcomingOnly: !showPastEvents,
+      });
+      setAllEvents(previous => [...previous, ...page.events]);
+      setNextCursor(page.nextCursor);
+    } catch (err) {
+      console.error('Error fetching more events:', err);
+      setError('Failed to load data. Please try again.');
+    } finally {
+      setLoadingMore(false);
+    }
+  };
 
   // Filter events based on search query and whether to show past events
   useEffect(() => {
@@ -192,18 +210,8 @@ const EventsList = () => {
       // Wait for all assignments to complete
       await Promise.all(assignmentPromises);
       
-      // Get school ID for refreshing events
-      const schoolId = localStorage.getItem('schoolId');
-      
       // Refresh the events list to show updated assignments
-      const response = await axios.get(`/api/events/?school=${schoolId}`);
-      
-      // Sort events by date (nearest first)
-      const sortedEvents = [...response.data].sort((a, b) => {
-        return new Date(a.date) - new Date(b.date);
-      });
-      
-      setAllEvents(sortedEvents);
+      await loadEvents();
       
       setAssignDialogOpen(false);
       setSelectedClasses([]);
@@ -544,6 +552,18 @@ const EventsList = () => {
               })}
             </Grid>
           )}
+          {nextCursor && (
+            <Box sx={{ display: 'flex', justifyContent: 'center', mt: 3 }}>
+              <Button
+                variant="outlined"
+                onClick={handleLoadMore}
+                disabled={loadingMore}
+                sx={{ color: '#DEA514', borderColor: '#DEA514' }}
+              >
+                {loadingMore ? <CircularProgress size={20} sx={{ color: '#DEA514' }} /> : 'Load more'}
+              </Button>
+            </Box>
+          )}
         </>
       )}
 
@@ -9,7 +9,8 @@ import {
   Divider, 
   Chip, 
   CircularProgress, 
-  Alert
+  Alert,
+  Button
 } from '@mui/material';
 import EventIcon from '@mui/icons-material/Event';
 import LocationOnIcon from '@mui/icons-material/LocationOn';
@@ -17,21 +18,37 @@ import AccessTimeIcon from '@mui/icons-material/AccessTime';
 import CheckCircleOutlineIcon from '@mui/icons-material/CheckCircleOutline';
 import axios from '../../utils/axios';
 
+// Number of records requested per page of history
+const PAGE_SIZE = 25;
+
 const AttendanceHistory = () => {
   const [attendanceRecords, setAttendanceRecords] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [error, setError] = useState('');
 
+  // Fetch one page of history, newest first; the cursor comes from the previous page's next link
+  const fetchPage = async (cursor) => {
+    const studentId = localStorage.getItem('studentId');
+    if (!studentId) {
+      throw new Error('Authentication required');
+    }
+
+    const params = { page_size: PAGE_SIZE };
+    if (cursor) {
+      params.cursor = cursor;
+    }
+    const response = await axios.get(`/api/students/${studentId}/attendance/`, { params });
+    const next = response.data.next ? new URL(response.data.next).searchParams.get('cursor') : null;
+    setNextCursor(next);
+    return response.data.results;
+  };
+
   useEffect(() => {
     const fetchAttendanceHistory = async () => {
       try {
-        const studentId = localStorage.getItem('studentId');
-        if (!studentId) {
-          throw new Error('Authentication required');
-        }
-
-        const response = await axios.get(`/api/students/${studentId}/attendance/`);
-        setAttendanceRecords(response.data);
+        setAttendanceRecords(await fetchPage(null));
       } catch (err) {
         console.error("Error fetching attendance history:", err);
         setError('Failed to load your attendance history. Please try again later.');
@@ -43,6 +60,19 @@ const AttendanceHistory = () => {
     fetchAttendanceHistory();
   }, []);
 
+  const handleLoadMore = async () => {
+    setLoadingMore(true);
+    try {
+      const records = await fetchPage(nextCursor);
+      setAttendanceRecords(previous => [...previous, ...records]);
+    } catch (err) {
+      console.error("Error fetching attendance history:", err);
+      setError('Failed to load your attendance history. Please try again later.');
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   // Format date for display
   const formatDate = (dateString) => {
     const options = { 
@@ -91,7 +121,9 @@ const AttendanceHistory = () => {
         </Typography>
         <Typography variant="body2" color="text.secondary">
           {attendanceRecords.length > 0 
-            ? `You have attended ${attendanceRecords.length} event${attendanceRecords.length === 1 ? '' : 's'}.` 
+            ? (nextCursor
+              ? `Showing your ${attendanceRecords.length} most recent events.`
+              : `You have attended ${attendanceRecords.length} event${attendanceRecords.length === 1 ? '' : 's'}.`)
             : 'You have not attended any events yet.'}
         </Typography>
       </Box>
@@ -143,6 +175,18 @@ const AttendanceHistory = () => {
               {index < attendanceRecords.length - 1 && <Divider variant="inset" component="li" />}
             </React.Fragment>
           ))}
+          {nextCursor && (
+            <Box sx={{ display: 'flex', justifyContent: 'center', mt: 2 }}>
+              <Button
+                variant="outlined"
+                onClick={handleLoadMore}
+                disabled={loadingMore}
+                sx={{ color: '#DEA514', borderColor: '#DEA514' }}
+              >
+                {loadingMore ? <CircularProgress size={20} sx={{ color: '#DEA514' }} /> : 'Load more'}
+              </Button>
+            </Box>
+          )}
         </List>
       ) : (
         <Box sx={{ textAlign: 'center', py: 3, bgcolor: '#f8f8f8', borderRadius: 1 }}>
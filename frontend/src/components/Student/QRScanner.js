@@ -59,7 +59,7 @@ const QRScanner = () => {
   const fetchEventDetails = async (id) => {
     setLoading(true);
     try {
-      const response = await axios.get(`/api/events/${id}/`);
+      const response = await axios.get(`/api/event/${id}/`);
       setEventDetails(response.data);
     } catch (error) {
       console.error('Error fetching event details:', error);
@@ -331,10 +331,14 @@ const QRScanner = () => {
       console.log("Sending attendance payload:", payload);
       
       // Include location data and device ID in the attendance record
-      const response = await axios.post('/api/attendance/', payload);
+      const response = await axios.post('/api/attendance/check-in/', payload);
       console.log("Attendance response:", response.data);
       
-      setSuccess("Attendance recorded successfully!");
+      if (response.data.duplicate) {
+        setSuccess('You have already recorded attendance for this event.');
+      } else {
+        setSuccess("Attendance recorded successfully!");
+      }
       
       // Reset after success
       setTimeout(() => {
@@ -353,6 +357,9 @@ const QRScanner = () => {
           error.response.data.non_field_errors && 
           error.response.data.non_field_errors.includes('The fields student, event must make a unique set.')) {
         setSuccess('You have already recorded attendance for this event.');
+      } else if (error.response && error.response.data.non_field_errors) {
+        // e.g. scanning outside the event's check-in window
+        setError(error.response.data.non_field_errors.join(', '));
       } else {
         setError('Failed to record attendance: ' + (error.message || 'Unknown error'));
       }
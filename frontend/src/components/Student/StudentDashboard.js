@@ -144,7 +144,7 @@ const StudentDashboard = () => {
   const fetchEventDetails = async (id) => {
     setLoading(true);
     try {
-      const response = await axios.get(`/api/events/${id}/`);
+      const response = await axios.get(`/api/event/${id}/`);
       setEventDetails(response.data);
     } catch {
       setError('Failed to get event details. Please try again.');
@@ -220,9 +220,13 @@ const StudentDashboard = () => {
       console.log("Full attendance payload:", JSON.stringify(payload));
       
       // Send the request
-      const response = await axios.post('/api/attendance/', payload);
+      const response = await axios.post('/api/attendance/check-in/', payload);
       
-      setSuccess('Attendance recorded successfully!');
+      if (response.data.duplicate) {
+        setSuccess('You have already recorded attendance for this event.');
+      } else {
+        setSuccess('Attendance recorded successfully!');
+      }
       setTimeout(() => {
         setEventId(null);
         setEventDetails(null);
@@ -0,0 +1,27 @@
+import axios from './axios';
+
+// Number of events requested per page of a school's event list
+export const EVENTS_PAGE_SIZE = 50;
+
+/**
+ * Fetches one page of a school's events, soonest first
+ * @param {string} schoolId - The school whose events to list
+ * @param {Object} options - cursor from the previous page's nextCursor, and
+ *   upcomingOnly to leave out events before today
+ * @returns {Promise<{events: Array, nextCursor: string|null}>}
+ */
+export const fetchEventsPage = async (schoolId, { cursor = null, upcomingOnly = false } = {}) => {
+  const params = { school: schoolId, page_size: EVENTS_PAGE_SIZE };
+  if (upcomingOnly) {
+    const today = new Date();
+    const month = String(today.getMonth() + 1).padStart(2, '0');
+    const day = String(today.getDate()).padStart(2, '0');
+    params.date_from = `${today.getFullYear()}-${month}-${day}`;
+  }
+  if (cursor) {
+    params.cursor = cursor;
+  }
+  const response = await axios.get('/api/events/', { params });
+  const nextCursor = response.data.next ? new URL(response.data.next).searchParams.get('cursor') : null;
+  return { events: response.data.results, nextCursor };
+};